@@ -0,0 +1,130 @@
+import math
+import statistics
+from typing import Dict, List, Optional
+
+# Columns extracted from trade records; times are exchange ms
+METRICS = ("slippage_bps", "copy_latency_ms", "ack_latency_ms", "fill_latency_ms")
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def distribution(values: List[float]) -> Optional[Dict]:
+    """Summary of one metric; None without values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "mean": _rounded(statistics.fmean(ordered)),
+        "p50": _rounded(percentile(ordered, 50)),
+        "p90": _rounded(percentile(ordered, 90)),
+        "p99": _rounded(percentile(ordered, 99)),
+        "max": _rounded(ordered[-1]),
+    }
+
+
+def _rounded(value: float) -> float:
+    return round(value, 3) + 0.0  # + 0.0 turns -0.0 into 0.0
+
+
+def _difference(end, start) -> Optional[float]:
+    if end is None or start is None:
+        return None
+    return float(end - start)
+
+
+def trade_columns(trades: List[Dict]) -> Dict[str, List]:
+    """Turn copied trade records into columns, one value per trade (None where unknown)
+
+    Slippage is in basis points of the master fill price, positive when the
+    slave got the worse price.
+    """
+    columns = {name: [] for name in ("slave_id", "symbol", "timestamp") + METRICS}
+    for trade in trades:
+        master_price = trade.get('master_price')
+        if not master_price or trade.get('master_id') == 'reconciler':
+            continue
+        price = trade.get('price') if trade.get('status') == 'success' else None
+        slippage = None
+        if price:
+            direction = 1 if trade['side'] == 'BUY' else -1
+            slippage = direction * (price - master_price) / master_price * 10000
+        columns['slave_id'].append(trade['slave_id'])
+        columns['symbol'].append(trade['symbol'])
+        columns['timestamp'].append(trade['timestamp'])
+        columns['slippage_bps'].append(slippage)
+        columns['copy_latency_ms'].append(_difference(trade.get('dispatched_at'), trade.get('master_trade_time')))
+        columns['ack_latency_ms'].append(_difference(trade.get('acked_at'), trade.get('dispatched_at')))
+        columns['fill_latency_ms'].append(_difference(trade.get('filled_at'), trade.get('master_trade_time')))
+    return columns
+
+
+def summarize(columns: Dict[str, List], rows: List[int]) -> Dict:
+    """Distributions of every metric over the given rows"""
+    summary = {"count": len(rows)}
+    for name in METRICS:
+        column = columns[name]
+        summary[name] = distribution([column[i] for i in rows if column[i] is not None])
+    return summary
+
+
+def windows(columns: Dict[str, List], rows: List[int], size: int) -> List[Dict]:
+    """Consecutive windows of `size` trades, to show how copy quality moves over time"""
+    result = []
+    for start in range(0, len(rows), size):
+        chunk = rows[start:start + size]
+        slippage = [columns['slippage_bps'][i] for i in chunk if columns['slippage_bps'][i] is not None]
+        latency = sorted(columns['copy_latency_ms'][i] for i in chunk if columns['copy_latency_ms'][i] is not None)
+        result.append({
+            "until": columns['timestamp'][chunk[-1]],
+            "count": len(chunk),
+            "slippage_bps_mean": _rounded(statistics.fmean(slippage)) if slippage else None,
+            "copy_latency_ms_p50": _rounded(percentile(latency, 50)) if latency else None,
+        })
+    return result
+
+
+def copy_quality(trades: List[Dict], window: int = 50) -> Dict:
+    """Per-slave and per-symbol slippage and latency distributions over a trade history"""
+    columns = trade_columns(trades)
+
+    # Row indices per group, in history order
+    by_slave: Dict[str, List[int]] = {}
+    by_pair: Dict[tuple, List[int]] = {}
+    for i, (slave_id, symbol) in enumerate(zip(columns['slave_id'], columns['symbol'])):
+        by_slave.setdefault(slave_id, []).append(i)
+        by_pair.setdefault((slave_id, symbol), []).append(i)
+
+    slaves = {}
+    for slave_id, rows in by_slave.items():
+        slaves[slave_id] = {
+            **summarize(columns, rows),
+            "recent": summarize(columns, rows[-window:]),
+            "windows": windows(columns, rows, window),
+            "symbols": {},
+        }
+    for (slave_id, symbol), rows in by_pair.items():
+        slaves[slave_id]["symbols"][symbol] = {
+            **summarize(columns, rows),
+            "recent": summarize(columns, rows[-window:]),
+        }
+
+    # Where slippage costs the most
+    ranking = [
+        {"slave_id": slave_id, "symbol": symbol, "count": stats["count"],
+         "slippage_bps_mean": stats["slippage_bps"]["mean"]}
+        for slave_id, slave in slaves.items()
+        for symbol, stats in slave["symbols"].items() if stats["slippage_bps"]
+    ]
+    ranking.sort(key=lambda entry: entry["slippage_bps_mean"], reverse=True)
+
+    return {
+        "trades": len(columns['slave_id']),
+        "window": window,
+        "overall": summarize(columns, list(range(len(columns['slave_id'])))),
+        "worst_slippage": ranking[:10],
+        "slaves": slaves,
+    }
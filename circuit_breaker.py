@@ -0,0 +1,145 @@
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from binance.exceptions import BinanceAPIException
+
+from config import (
+    BREAKER_FAILURE_THRESHOLD, BREAKER_BASE_BACKOFF, BREAKER_MAX_BACKOFF
+)
+
+# Error classes
+FATAL = "fatal"          # Account cannot trade at all: quarantine immediately
+ACCOUNT = "account"      # Account-level problem (margin, balance): counts towards quarantine
+TRANSIENT = "transient"  # Network / rate limit / clock problems: counts towards quarantine
+ORDER = "order"          # Problem with this particular order: does not say anything about the account
+
+FATAL_CODES = {
+    -2014,  # API-key format invalid
+    -2015,  # Invalid API-key, IP, or permissions for action
+    -2008,  # Invalid Api-Key ID
+    -1022,  # Signature for this request is not valid
+}
+ACCOUNT_CODES = {
+    -2018,  # Balance is insufficient
+    -2019,  # Margin is insufficient
+    -2027,  # Exceeded the maximum allowable position at current leverage
+    -2028,  # Leverage is smaller than permitted
+}
+TRANSIENT_CODES = {
+    -1000,  # Unknown error
+    -1001,  # Internal error / disconnected
+    -1003,  # Too many requests
+    -1007,  # Timeout waiting for backend
+    -1008,  # Server busy
+    -1021,  # Timestamp outside of recvWindow
+}
+
+# States
+CLOSED = "closed"        # Healthy, orders flow
+OPEN = "open"            # Quarantined, orders are skipped until the next probe
+HALF_OPEN = "half_open"  # Quarantine expired, one order at a time is the probe
+
+
+def classify_error(error: BaseException) -> str:
+    """Map an exception raised while copying to an error class"""
+    if isinstance(error, BinanceAPIException):
+        message = str(error.message or "")
+        if error.status_code == 451 or "restricted location" in message:
+            return FATAL
+        if error.status_code in (418, 429):
+            return TRANSIENT
+        if error.code in FATAL_CODES:
+            return FATAL
+        if error.code in ACCOUNT_CODES:
+            return ACCOUNT
+        if error.code in TRANSIENT_CODES:
+            return TRANSIENT
+        return ORDER
+    return TRANSIENT
+
+
+class CircuitBreaker:
+    """Tracks failures of one slave and quarantines it with exponential backoff"""
+
+    def __init__(self, account_id: str):
+        self.account_id = account_id
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.quarantine_count = 0  # Consecutive quarantines, drives the backoff
+        self.next_probe_at = 0.0
+        self.quarantined_since: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_error_class: Optional[str] = None
+        self.skipped = 0
+        self.probing = False  # A probe order is in flight
+
+    def allow(self) -> bool:
+        """Return True if an order may be sent to this slave now"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() >= self.next_probe_at:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self.probing:
+            # Single probe, even with copies running on several lanes: its
+            # outcome closes the breaker or re-quarantines the slave
+            self.probing = True
+            return True
+        self.skipped += 1
+        return False
+
+    def release_probe(self):
+        """End a probe that placed no order; the next order probes instead"""
+        self.probing = False
+
+    def record_success(self):
+        self.probing = False
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.quarantine_count = 0
+        self.quarantined_since = None
+
+    def record_failure(self, error: BaseException) -> str:
+        """Record a failed copy; returns the error class"""
+        error_class = classify_error(error)
+        self.probing = False
+        self.last_error = str(error)
+        self.last_error_class = error_class
+
+        if error_class == ORDER:
+            # The slave is reachable and answered; a probe counts as passed
+            if self.state == HALF_OPEN:
+                self.record_success()
+            return error_class
+
+        self.consecutive_failures += 1
+        if (self.state == HALF_OPEN or error_class == FATAL
+                or self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD):
+            self._quarantine()
+        return error_class
+
+    def reset(self):
+        """Manually release the slave from quarantine"""
+        self.record_success()
+        self.skipped = 0
+
+    def _quarantine(self):
+        backoff = min(BREAKER_MAX_BACKOFF, BREAKER_BASE_BACKOFF * (2 ** self.quarantine_count))
+        self.quarantine_count += 1
+        self.state = OPEN
+        self.next_probe_at = time.monotonic() + backoff
+        if self.quarantined_since is None:
+            self.quarantined_since = datetime.now().isoformat()
+
+    def snapshot(self) -> Dict:
+        """State for the status API"""
+        return {
+            "state": self.state,
+            "quarantined": self.state != CLOSED,
+            "consecutive_failures": self.consecutive_failures,
+            "quarantined_since": self.quarantined_since,
+            "next_probe_in": round(max(0.0, self.next_probe_at - time.monotonic()), 1) if self.state == OPEN else None,
+            "skipped_orders": self.skipped,
+            "last_error": self.last_error,
+            "last_error_class": self.last_error_class,
+        }
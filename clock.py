@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import math
+import statistics
+import time
+import weakref
+from collections import deque
+from typing import Dict, Optional
+
+from config import (
+    CLOCK_SYNC_INTERVAL, CLOCK_SAMPLES_PER_SYNC, CLOCK_SAMPLE_WINDOW,
+    RECV_WINDOW_MIN, RECV_WINDOW_MAX
+)
+
+logger = logging.getLogger(__name__)
+
+# Binance error code for a timestamp outside of recvWindow (or ahead of server time)
+TIMESTAMP_ERROR = -1021
+
+
+class ServerClock:
+    """Single estimate of the exchange clock offset, shared by every client
+
+    Server time is sampled in the background. A sample's offset error is at
+    most half its round trip, so the offset is the median over the
+    lowest-latency recent samples, which filters out network jitter. Attached
+    clients get every new offset through their `timestamp_offset`.
+    """
+
+    def __init__(self, window: int = CLOCK_SAMPLE_WINDOW):
+        self.samples = deque(maxlen=window)  # (round trip ms, offset ms)
+        self.offset_ms = 0
+        self.error_ms = 0  # Bound of the offset's error: half the slowest round trip it is based on
+        self.synced_at: Optional[float] = None
+        self._clients = weakref.WeakSet()
+        self._resync = asyncio.Event()
+        self._sync_task: Optional[asyncio.Future] = None
+
+    @property
+    def synced(self) -> bool:
+        return self.synced_at is not None
+
+    def now_ms(self) -> int:
+        """Current exchange time in ms, per the estimate"""
+        return int(time.time() * 1000 + self.offset_ms)
+
+    def attach(self, client):
+        """Keep a client's timestamp_offset on the shared estimate"""
+        client.timestamp_offset = self.offset_ms
+        self._clients.add(client)
+
+    def add_sample(self, round_trip_ms: float, offset_ms: float):
+        self.samples.append((round_trip_ms, offset_ms))
+        best = sorted(self.samples)[:max(1, len(self.samples) // 3)]
+        self.offset_ms = int(statistics.median(offset for _, offset in best))
+        self.error_ms = math.ceil(max(round_trip for round_trip, _ in best) / 2)
+        self.synced_at = time.monotonic()
+        for client in list(self._clients):
+            client.timestamp_offset = self.offset_ms
+
+    async def sample(self, client):
+        """Measure the offset once with a public server time request"""
+        sent = time.time() * 1000
+        response = await client.futures_time()
+        received = time.time() * 1000
+        self.add_sample(received - sent, response['serverTime'] - (sent + received) / 2)
+
+    async def sync(self, client, samples: int = CLOCK_SAMPLES_PER_SYNC):
+        for _ in range(samples):
+            await self.sample(client)
+
+    async def ensure_synced(self, client):
+        """Sync once if no estimate exists yet; failures leave the local clock in use"""
+        if self.synced:
+            return
+        try:
+            await self.sync(client)
+            logger.info("Server clock offset %s ms, recvWindow %s ms", self.offset_ms, self.recv_window_ms())
+        except Exception as e:
+            logger.warning("Server time sync failed, using the local clock: %s", e)
+
+    def request_resync(self):
+        """Sample again now, e.g. after a timestamp rejection"""
+        self._resync.set()
+
+    async def resync(self, client):
+        """Sync now and wait for it; concurrent callers share one sync, failures are logged"""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.ensure_future(self.sync(client))
+        try:
+            await asyncio.shield(self._sync_task)
+        except Exception as e:
+            logger.warning("Server time sync failed: %s", e)
+
+    async def run(self, client):
+        """Keep the estimate current until cancelled"""
+        while True:
+            try:
+                await asyncio.wait_for(self._resync.wait(), CLOCK_SYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._resync.clear()
+            try:
+                await self.sync(client)
+            except Exception as e:
+                logger.warning("Server time sync failed: %s", e)
+
+    def recv_window_ms(self, request_latency: Optional[float] = None) -> int:
+        """recvWindow for signed requests
+
+        Three times the slowest recent server time round trip, or the request's
+        own latency (seconds, e.g. the p99 order ack latency) if that is
+        slower: server time requests are far lighter than orders. Hedged
+        orders send their first request with the hedge deadline instead
+        (orders.submit_order), so it expires before the order is resent.
+        """
+        if not self.samples:
+            return RECV_WINDOW_MAX
+        slowest = max(round_trip for round_trip, _ in self.samples)
+        if request_latency is not None:
+            slowest = max(slowest, request_latency * 1000)
+        return int(min(RECV_WINDOW_MAX, max(RECV_WINDOW_MIN, 3 * slowest)))
+
+    def snapshot(self) -> Dict:
+        """Clock state for the status API"""
+        round_trips = [round_trip for round_trip, _ in self.samples]
+        return {
+            "offset_ms": self.offset_ms,
+            "error_ms": self.error_ms,
+            "recv_window_ms": self.recv_window_ms(),
+            "samples": len(self.samples),
+            "min_round_trip_ms": round(min(round_trips), 1) if round_trips else None,
+            "last_sync_s_ago": round(time.monotonic() - self.synced_at, 1) if self.synced else None,
+        }
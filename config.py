@@ -8,12 +8,85 @@ DATA_DIR = BASE_DIR / "data"
 ACCOUNTS_FILE = DATA_DIR / "accounts.json"
 TRADES_FILE = DATA_DIR / "trades.json"
 SYSTEM_FILE = DATA_DIR / "system.json"
+STATE_FILE = DATA_DIR / "state.json"  # Warm-state snapshot for fast restarts
+
+# Trade history
+RECENT_TRADES_SIZE = 1000  # Latest trades kept in the trade log and in memory for the dashboard and analytics
+TRADE_LOG_FLUSH_DELAY = 1.0  # Seconds confirmed fills may wait to be written with the next trade log write
 
 # API settings
 API_RATE_LIMIT_DELAY = 0.1  # Delay between API calls in seconds
 
+# Slave dispatch priority tiers (account "tier"), dispatched in this order. Each
+# tier has its own order budget: one order per `interval` seconds, `burst` at once.
+DISPATCH_TIERS = {
+    "premium": {"interval": 0.02, "burst": 10},
+    "standard": {"interval": API_RATE_LIMIT_DELAY, "burst": 1},
+    "economy": {"interval": 2 * API_RATE_LIMIT_DELAY, "burst": 1},
+}
+DEFAULT_TIER = "standard"
+
+# Dispatch lanes: fills are copied in order per symbol, symbols in parallel
+DISPATCH_LANES = 0  # 0 = one lane per symbol, N = symbols hashed onto N lanes
+LANE_DEPTH_WARNING = 20  # Fills queued on one lane before a warning is logged
+
 # Logging
 LOG_LEVEL = "INFO"
+LOG_LEVELS = {  # Per-component overrides, by logger name
+    "binance": "WARNING",
+    "websockets": "WARNING",
+}
+LOG_FILE = "binance_trade_copier.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate the log file at this size
+LOG_BACKUP_COUNT = 5  # Rotated log files to keep
+LOG_QUEUE_SIZE = 10000  # Records buffered for the writer thread; extra records are dropped (see /api/status)
+LOG_JSON = False  # Write the log file as JSON lines instead of text
 
 # Web interface
 WEB_PASSWORD = "admin123"  # Basic password protection
+
+# Stream recording (offline profiling / replay)
+RECORD_STREAMS = False  # Capture every raw master stream message to RECORDINGS_DIR
+RECORDINGS_DIR = DATA_DIR / "recordings"
+
+# Order submission
+CLIENT_ORDER_ID_PREFIX = "tc-"  # Prefix of deterministic slave client order ids
+HEDGED_ORDERS = True  # Resend slow orders on a second connection with the same client order id
+HEDGE_DEADLINE_PERCENTILE = 99  # Ack latency percentile used as the hedge deadline
+HEDGE_DEADLINE_DEFAULT = 1.0  # Hedge deadline in seconds until enough acks were measured
+HEDGE_DEADLINE_MIN = 0.2  # Lower bound of the hedge deadline in seconds
+HEDGE_DEADLINE_MAX = 3.0  # Upper bound of the hedge deadline in seconds
+HEDGE_MIN_SAMPLES = 20  # Acks required before the percentile deadline is used
+ORDER_ACK_RESPONSES = True  # Request ACK responses; fills are confirmed from the slave's own stream
+PENDING_FILLS_MAX = 1000  # Acked orders awaiting their streamed fill before the oldest is looked up instead
+ORDER_TRANSPORTS = ("rest", "ws")  # Accepted account order_transport values
+WS_API_URL = "wss://ws-fapi.binance.com/ws-fapi/v1"  # Futures WebSocket API, for accounts with order_transport "ws"
+WS_API_TIMEOUT = 10  # Seconds to wait for a WebSocket API response
+
+# Server time
+CLOCK_SYNC_INTERVAL = 60  # Seconds between server time syncs (shared by all clients)
+CLOCK_SAMPLES_PER_SYNC = 3  # Server time samples per sync
+CLOCK_SAMPLE_WINDOW = 30  # Recent samples kept; the lowest-latency third sets the offset
+RECV_WINDOW_MIN = 5000  # Lower bound in ms of the recvWindow sent with orders (3x slowest round trip), Binance's default
+RECV_WINDOW_MAX = 15000  # Upper bound in ms, also used until the clock is synced
+
+# Startup
+STARTUP_TIMEOUT = 30  # Seconds to wait for a master stream to open on /api/start
+DETACH_TIMEOUT = 10  # Seconds to wait for a removed account to finish in-flight copies
+WARMUP_RETRY_INTERVAL = 5  # Seconds between background retries of a failed warm-up or revalidation
+
+# Per-slave circuit breaker
+BREAKER_FAILURE_THRESHOLD = 3  # Consecutive account-level failures before quarantine
+BREAKER_BASE_BACKOFF = 30  # Seconds before the first probe of a quarantined slave
+BREAKER_MAX_BACKOFF = 1800  # Upper bound of the doubling probe backoff in seconds
+
+# Warm-state snapshot
+SNAPSHOT_INTERVAL = 60  # Seconds between periodic state snapshots
+RESUME_ON_STARTUP = True  # Resume copying on boot if it was active when the process stopped
+SEEN_FILLS_PER_MASTER = 500  # Recently copied master fills remembered for de-duplication
+
+# Position drift reconciliation
+RECONCILE_INTERVAL = 60  # Seconds between drift checks (uses stream-maintained positions)
+RECONCILE_REFRESH_INTERVAL = 300  # Minimum seconds between REST position refreshes of one account
+DRIFT_THRESHOLD = 0.05  # Relative difference from the expected position that counts as drift
+DRIFT_CORRECTION = True  # Place corrective orders for confirmed drift (False: report only)
@@ -0,0 +1,1327 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from typing import Dict, List, Optional, Tuple
+
+from binance import AsyncClient, BinanceSocketManager
+from binance.exceptions import BinanceAPIException
+
+from config import (
+    DATA_DIR, ACCOUNTS_FILE, TRADES_FILE, SYSTEM_FILE, RECENT_TRADES_SIZE, TRADE_LOG_FLUSH_DELAY,
+    RECORD_STREAMS, HEDGED_ORDERS,
+    STARTUP_TIMEOUT, DETACH_TIMEOUT, WARMUP_RETRY_INTERVAL, SNAPSHOT_INTERVAL, RESUME_ON_STARTUP,
+    SEEN_FILLS_PER_MASTER, RECONCILE_INTERVAL, RECONCILE_REFRESH_INTERVAL, DRIFT_CORRECTION,
+    ORDER_ACK_RESPONSES, PENDING_FILLS_MAX, CLIENT_ORDER_ID_PREFIX
+)
+from circuit_breaker import CircuitBreaker, OPEN
+from clock import ServerClock, TIMESTAMP_ERROR
+from lanes import DispatchLanes
+from logging_setup import setup_logging
+from orders import AckLatencyTracker, make_client_order_id, submit_order
+from position_book import FINAL_ORDER_STATES, PositionBook, direction_of, plan_copy, signed_quantity
+from recent_trades import RecentTrades
+from reconciler import DriftReconciler
+from scheduler import DispatchScheduler
+from recorder import StreamRecorder
+from snapshot import load_snapshot, save_snapshot
+from ws_orders import WsOrderClient
+
+# Setup logging (records are written by a background thread)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Global variables
+active_connections: Dict[str, AsyncClient] = {}
+socket_managers: Dict[str, BinanceSocketManager] = {}
+hedge_connections: Dict[str, AsyncClient] = {}  # Second connection per slave for hedged orders
+ack_latency: Dict[str, AckLatencyTracker] = {}
+copier_tasks: Dict[str, asyncio.Task] = {}  # Master stream tasks
+system_ready = False  # True once every account is connected, warmed and streaming
+account_readiness: Dict[str, Dict] = {}
+position_modes: Dict[str, bool] = {}  # Cached dualSidePosition per account
+account_balances: Dict[str, float] = {}  # Balance loaded at warm-up, then kept current by slave streams
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+account_registry: Dict[str, Dict] = {}  # In-memory accounts used by the running copier
+master_stop_events: Dict[str, asyncio.Event] = {}  # Set to drain a single master stream
+dispatching_masters: Dict[str, int] = {}  # Fills queued or being copied per master
+inflight_orders: Dict[str, int] = {}  # Orders being placed per slave
+symbol_filters: Dict[str, Dict] = {}  # Exchange filters per symbol (step size, min notional)
+seen_fills: Dict[str, Dict[str, None]] = {}  # Recently copied fills per master (insertion ordered)
+stream_cursors: Dict[str, int] = {}  # Last event time (E) received per master stream
+restored_accounts: set = set()  # Accounts warmed from the snapshot, revalidated in background
+background_tasks: set = set()
+copying_active = False
+position_book = PositionBook()  # Positions of masters and slaves, kept current from their streams
+slave_stream_tasks: Dict[str, asyncio.Task] = {}
+order_clients: Dict[str, WsOrderClient] = {}  # Slaves placing orders over the WebSocket API
+streaming_slaves: set = set()  # Slaves whose user-data stream is open
+pending_fills: Dict[str, Dict] = {}  # Trade records of acked orders awaiting their fill, by client order id
+early_fills: Dict[str, Dict] = {}  # Order outcomes that arrived before the ack was processed
+reconciler = DriftReconciler()
+positions_refreshed_at: Dict[str, float] = {}  # Monotonic time of each account's last REST position load
+reconcile_task: Optional[asyncio.Task] = None
+server_clock = ServerClock()  # Exchange clock offset shared by every client
+dispatch_scheduler = DispatchScheduler()
+dispatch_lanes = DispatchLanes()
+recent_trades = RecentTrades()  # Latest trade records and running totals, served by the API
+trade_log_updates: Dict[str, Dict] = {}  # Order outcomes not yet written to the trade log, by client order id
+trade_log_flush: Optional[asyncio.TimerHandle] = None
+clock_client: Optional[AsyncClient] = None  # Keyless client sampling server time
+
+# File operations
+def ensure_data_files():
+    """Ensure all required data files exist"""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    
+    for file_path, default_content in [
+        (ACCOUNTS_FILE, {"accounts": []}),
+        (TRADES_FILE, {"trades": []}),
+        (SYSTEM_FILE, {"copying_active": False, "started_at": None})
+    ]:
+        if not file_path.exists():
+            logger.info("Creating default file: %s", file_path)
+            with open(file_path, 'w') as f:
+                json.dump(default_content, f, indent=2)
+
+def load_accounts() -> List[Dict]:
+    """Load accounts from JSON file"""
+    with open(ACCOUNTS_FILE, 'r') as f:
+        data = json.load(f)
+    return data.get('accounts', [])
+
+def save_accounts(accounts: List[Dict]):
+    """Save accounts to JSON file"""
+    with open(ACCOUNTS_FILE, 'w') as f:
+        json.dump({"accounts": accounts}, f, indent=2)
+    account_registry.clear()
+    account_registry.update({acc['id']: acc for acc in accounts})
+
+def registered_accounts() -> List[Dict]:
+    """Accounts known to the running copier, without re-reading the file"""
+    if not account_registry:
+        account_registry.update({acc['id']: acc for acc in load_accounts()})
+    return list(account_registry.values())
+
+def load_recent_trades():
+    """Rebuild the in-memory recent trades from the trade log"""
+    with open(TRADES_FILE, 'r') as f:
+        recent_trades.load(json.load(f)['trades'])
+
+def save_trade(trade_data: Dict):
+    """Save trade record to JSON file"""
+    recent_trades.append(trade_data)
+    with open(TRADES_FILE, 'r+') as f:
+        trades = json.load(f)
+        trades['trades'].append(trade_data)
+        # Keep only the last RECENT_TRADES_SIZE trades, as many as are held in memory
+        trades['trades'] = trades['trades'][-RECENT_TRADES_SIZE:]
+        apply_trade_updates(trades['trades'])
+        f.seek(0)
+        f.truncate()
+        json.dump(trades, f, indent=2)
+
+def apply_trade_updates(trades: List[Dict]):
+    """Fill the outcomes received since the last trade log write into its records"""
+    for trade in reversed(trades):
+        if not trade_log_updates:
+            break
+        updates = trade_log_updates.pop(trade.get('client_order_id'), None)
+        if updates:
+            trade.update(updates)
+    # Records that already left the log
+    trade_log_updates.clear()
+
+def complete_trade(client_order_id: str, updates: Dict):
+    """Fill in a saved trade record once the outcome of its order is known
+
+    The trade log is not rewritten for every fill: the outcome is written with
+    the next saved trade, or after TRADE_LOG_FLUSH_DELAY seconds at the latest.
+    """
+    global trade_log_flush
+    recent_trades.update(client_order_id, updates)
+    trade_log_updates.setdefault(client_order_id, {}).update(updates)
+    if trade_log_flush is None:
+        trade_log_flush = asyncio.get_running_loop().call_later(TRADE_LOG_FLUSH_DELAY, flush_trade_updates)
+
+def flush_trade_updates():
+    """Write order outcomes still waiting for a trade log write"""
+    global trade_log_flush
+    if trade_log_flush is not None:
+        trade_log_flush.cancel()
+        trade_log_flush = None
+    if not trade_log_updates:
+        return
+    with open(TRADES_FILE, 'r+') as f:
+        trades = json.load(f)
+        apply_trade_updates(trades['trades'])
+        f.seek(0)
+        f.truncate()
+        json.dump(trades, f, indent=2)
+
+def update_system_state(copying: bool):
+    """Update system state"""
+    with open(SYSTEM_FILE, 'w') as f:
+        json.dump({
+            "copying_active": copying,
+            "started_at": datetime.now().isoformat() if copying else None
+        }, f, indent=2)
+
+# Warm-state snapshot
+def collect_state() -> Dict:
+    """Copy of the runtime state worth keeping across restarts"""
+    return {
+        "symbol_filters": dict(symbol_filters),
+        "position_modes": dict(position_modes),
+        "seen_fills": {master_id: list(fills) for master_id, fills in seen_fills.items()},
+        "stream_cursors": dict(stream_cursors),
+        "copy_ratios": reconciler.ratios
+    }
+
+def restore_state(snapshot: Dict):
+    """Prime the caches from a snapshot; entries are revalidated once accounts connect"""
+    symbol_filters.update(snapshot.get("symbol_filters", {}))
+    position_modes.update(snapshot.get("position_modes", {}))
+    for master_id, fills in snapshot.get("seen_fills", {}).items():
+        seen_fills[master_id] = dict.fromkeys(fills)
+    stream_cursors.update(snapshot.get("stream_cursors", {}))
+    reconciler.restore(snapshot.get("copy_ratios", {}))
+    restored_accounts.update(position_modes)
+    if snapshot:
+        logger.info("Restored state snapshot from %s: %s symbols, %s accounts",
+                    snapshot.get('saved_at'), len(symbol_filters), len(position_modes))
+
+async def snapshot_loop():
+    """Periodically persist the runtime state"""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            await asyncio.to_thread(save_snapshot, collect_state())
+        except Exception as e:
+            logger.error("Failed to save state snapshot: %s", e)
+
+async def cancel_tasks(tasks: List[asyncio.Task]):
+    """Cancel tasks and wait until they finished cleaning up"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def run_in_background(coro):
+    """Start a task and keep a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def is_new_fill(master_id: str, fill_key: str) -> bool:
+    """Remember a master fill; False if it was already copied"""
+    fills = seen_fills.setdefault(master_id, {})
+    if fill_key in fills:
+        return False
+    fills[fill_key] = None
+    if len(fills) > SEEN_FILLS_PER_MASTER:
+        del fills[next(iter(fills))]
+    return True
+
+def get_circuit_breaker(account_id: str) -> CircuitBreaker:
+    """Get or create the circuit breaker of an account"""
+    breaker = circuit_breakers.get(account_id)
+    if breaker is None:
+        breaker = circuit_breakers[account_id] = CircuitBreaker(account_id)
+    return breaker
+
+def ack_latency_p50(account_id: str) -> Optional[float]:
+    """Median recent order ack latency of an account, None before its first order"""
+    tracker = ack_latency.get(account_id)
+    return tracker.percentile(50) if tracker else None
+
+def record_copy_failure(slave_id: str, error: BaseException):
+    """Feed a copy failure to the slave's circuit breaker and log quarantines"""
+    if isinstance(error, BinanceAPIException) and error.code == TIMESTAMP_ERROR:
+        server_clock.request_resync()
+    breaker = get_circuit_breaker(slave_id)
+    was_open = breaker.state == OPEN
+    error_class = breaker.record_failure(error)
+    if breaker.state == OPEN and not was_open:
+        logger.warning("Slave %s quarantined after %s error, next probe in %ss",
+                       slave_id, error_class, breaker.snapshot()['next_probe_in'])
+
+# API clients
+def get_clock_client() -> AsyncClient:
+    """Keyless client for public endpoints (server time, exchange info)"""
+    global clock_client
+    if clock_client is None:
+        clock_client = AsyncClient()
+    return clock_client
+
+async def create_client(api_key: str, api_secret: str) -> AsyncClient:
+    """Create an API client on the shared server clock instead of syncing its own"""
+    await server_clock.ensure_synced(get_clock_client())
+    client = AsyncClient(api_key, api_secret)
+    server_clock.attach(client)
+    return client
+
+# Trading functions
+def balance_from_account_info(account_info: Dict) -> float:
+    """Extract the balance from a futures_account response"""
+    # Use totalWalletBalance for the total balance including unrealized PnL
+    balance = float(account_info.get('totalWalletBalance', 0))
+    # If totalWalletBalance is 0, try availableBalance
+    if balance == 0:
+        balance = float(account_info.get('availableBalance', 0))
+    return balance
+
+def balance_from_account_update(msg: Dict) -> Optional[float]:
+    """USDT wallet balance from an ACCOUNT_UPDATE, None if it did not change
+
+    This is what totalWalletBalance reports for a single-asset account.
+    """
+    for balance in msg.get('a', {}).get('B', []):
+        if balance.get('a') == 'USDT':
+            return float(balance['wb'])
+    return None
+
+def parse_symbol_filters(exchange_info: Dict) -> Dict[str, Dict]:
+    """Extract the order size filters of every symbol from futures_exchange_info"""
+    filters = {}
+    for symbol_info in exchange_info.get('symbols', []):
+        by_type = {f['filterType']: f for f in symbol_info.get('filters', [])}
+        lot_size = by_type.get('MARKET_LOT_SIZE') or by_type.get('LOT_SIZE') or {}
+        filters[symbol_info['symbol']] = {
+            "step_size": lot_size.get('stepSize', '0.001'),
+            "min_notional": float(by_type.get('MIN_NOTIONAL', {}).get('notional', 20.0))
+        }
+    return filters
+
+async def refresh_symbol_filters():
+    """Load exchange filters (public endpoint, no account needed)"""
+    try:
+        exchange_info = await get_clock_client().futures_exchange_info()
+        symbol_filters.update(parse_symbol_filters(exchange_info))
+        logger.info("Loaded exchange filters for %s symbols", len(symbol_filters))
+    except Exception as e:
+        logger.error("Failed to load exchange filters: %s", e)
+
+def round_to_step(quantity: float, step_size: str, up: bool = False) -> float:
+    """Round a quantity to a multiple of the symbol's step size"""
+    step = Decimal(step_size)
+    steps = (Decimal(str(quantity)) / step).to_integral_value(ROUND_CEILING if up else ROUND_FLOOR)
+    return float(steps * step)
+
+async def get_account_balance(client: AsyncClient) -> float:
+    """Get futures account balance"""
+    try:
+        account_info = await client.futures_account()
+        return balance_from_account_info(account_info)
+    except BinanceAPIException as e:
+        if "restricted location" in str(e):
+            raise Exception("Binance access restricted in your location")
+        elif "Invalid API" in str(e):
+            raise Exception("Invalid API key or secret")
+        else:
+            raise Exception(f"API Error: {str(e)}")
+    except Exception as e:
+        logger.error("Error getting account balance: %s", e)
+        raise
+
+async def get_account_history(client: AsyncClient, account_type: str) -> Dict:
+    """Get comprehensive account history"""
+    history = {
+        "balance_history": [],
+        "trade_history": [],
+        "deposit_history": [],
+        "withdraw_history": [],
+        "positions": []
+    }
+    
+    try:
+        # Get current account info
+        account_info = await client.futures_account()
+        
+        # Get balance info
+        history["current_balance"] = {
+            "total": float(account_info.get('totalWalletBalance', 0)),
+            "available": float(account_info.get('availableBalance', 0)),
+            "margin": float(account_info.get('totalMarginBalance', 0)),
+            "unrealized_pnl": float(account_info.get('totalUnrealizedProfit', 0))
+        }
+        
+        # Get open positions
+        positions = account_info.get('positions', [])
+        for pos in positions:
+            if float(pos.get('positionAmt', 0)) != 0:
+                history["positions"].append({
+                    "symbol": pos.get('symbol'),
+                    "amount": float(pos.get('positionAmt', 0)),
+                    "entry_price": float(pos.get('entryPrice', 0)),
+                    "mark_price": float(pos.get('markPrice', 0)),
+                    "pnl": float(pos.get('unrealizedProfit', 0)),
+                    "side": "LONG" if float(pos.get('positionAmt', 0)) > 0 else "SHORT"
+                })
+        
+        # Get recent trades (last 7 days)
+        try:
+            trades = await client.futures_account_trades(limit=100)
+            for trade in trades:
+                history["trade_history"].append({
+                    "time": datetime.fromtimestamp(trade['time'] / 1000).isoformat(),
+                    "symbol": trade['symbol'],
+                    "side": trade['side'],
+                    "price": float(trade['price']),
+                    "qty": float(trade['qty']),
+                    "commission": float(trade['commission']),
+                    "realized_pnl": float(trade.get('realizedPnl', 0))
+                })
+        except Exception as e:
+            logger.error("Error fetching trade history: %s", e)
+        
+        # Get deposit/withdraw history (spot wallet)
+        try:
+            # Check spot deposit history
+            deposits = await client.get_deposit_history()
+            if deposits:
+                for dep in deposits:
+                    history["deposit_history"].append({
+                        "time": datetime.fromtimestamp(dep['insertTime'] / 1000).isoformat(),
+                        "coin": dep['coin'],
+                        "amount": float(dep['amount']),
+                        "status": dep['status']
+                    })
+        except Exception as e:
+            logger.error("Error fetching deposit history: %s", e)
+        
+        # Get income history (funding fees, commissions, etc.)
+        try:
+            income = await client.futures_income_history(limit=100)
+            for inc in income:
+                if inc['incomeType'] == 'FUNDING_FEE':
+                    history["trade_history"].append({
+                        "time": datetime.fromtimestamp(inc['time'] / 1000).isoformat(),
+                        "symbol": inc['symbol'],
+                        "side": "FUNDING",
+                        "price": 0,
+                        "qty": 0,
+                        "commission": float(inc['income']),
+                        "realized_pnl": 0
+                    })
+        except Exception as e:
+            logger.error("Error fetching income history: %s", e)
+            
+    except Exception as e:
+        logger.error("Error getting account history: %s", e)
+        raise
+    
+    return history
+
+def handle_master_message(msg: Dict, master_id: str) -> Optional[asyncio.Future]:
+    """Update the master's position book, then queue fills on their symbol's dispatch lane
+
+    Returns a future that resolves once the fill was copied, None for other messages.
+    """
+    if msg.get('e') != 'ORDER_TRADE_UPDATE':
+        position_book.apply_message(master_id, msg)
+        return None
+    
+    order_data = msg['o']
+    after = position_book.apply_order_update(master_id, msg)
+    if order_data['X'] != 'FILLED':
+        return None
+    master_position = None
+    if after is not None:
+        # Position before the whole order, so partial fills count as one change
+        before = after - signed_quantity(order_data['S'], float(order_data.get('z', order_data['q'])))
+        master_position = (before, after)
+    
+    dispatching_masters[master_id] = dispatching_masters.get(master_id, 0) + 1
+    future = dispatch_lanes.submit(
+        order_data['s'], copy_to_slaves(msg, master_id, master_position, received=time.perf_counter())
+    )
+    future.add_done_callback(lambda _: finish_dispatch(master_id))
+    return future
+
+def finish_dispatch(master_id: str):
+    remaining = dispatching_masters.get(master_id, 0) - 1
+    if remaining > 0:
+        dispatching_masters[master_id] = remaining
+    else:
+        dispatching_masters.pop(master_id, None)
+
+def order_outcome(status: str, avg_price, filled_quantity, filled_at: Optional[int] = None) -> Dict:
+    """Trade record fields for an order in a final state"""
+    if status == 'FILLED':
+        return {"status": "success", "price": float(avg_price), "quantity": float(filled_quantity),
+                "filled_at": filled_at}
+    return {"status": "failed", "error": f"Order {status.lower()}"}
+
+def save_slave_trade(trade_record: Dict, order: Dict):
+    """Save the trade of an accepted slave order, completed now or once its fill is streamed"""
+    client_order_id = trade_record['client_order_id']
+    if order.get('status') in FINAL_ORDER_STATES:
+        # Full response (or a looked-up order): the outcome is already known
+        trade_record.update(order_outcome(order['status'], order.get('avgPrice'), order.get('executedQty'),
+                                          order.get('updateTime')))
+    elif client_order_id in early_fills:
+        trade_record.update(early_fills.pop(client_order_id))
+    elif trade_record['slave_id'] in streaming_slaves:
+        trade_record.update(status="pending", price=None)
+        pending_fills[client_order_id] = trade_record
+        if len(pending_fills) > PENDING_FILLS_MAX:
+            # Its final update never came; ask the exchange instead
+            oldest_id = next(iter(pending_fills))
+            oldest = pending_fills.pop(oldest_id)
+            run_in_background(resolve_pending_fills(oldest['slave_id'], {oldest_id: oldest}))
+    else:
+        # An ACK whose slave stream closed meanwhile: nothing will confirm the fill
+        trade_record.update(status="pending", price=None)
+        save_trade(trade_record)
+        run_in_background(resolve_pending_fills(trade_record['slave_id'], {client_order_id: trade_record}))
+        return
+    save_trade(trade_record)
+
+async def resolve_pending_fills(slave_id: str, records: Dict[str, Dict]):
+    """Complete pending trade records whose fill the slave's stream will not confirm
+
+    Each order is looked up by its client order id; one that cannot be looked
+    up, or is not in a final state yet, is recorded as unconfirmed.
+    """
+    client = active_connections.get(slave_id)
+    
+    async def resolve(client_order_id: str, trade_record: Dict):
+        outcome = None
+        if client is not None:
+            try:
+                order = await client.futures_get_order(symbol=trade_record['symbol'],
+                                                       origClientOrderId=client_order_id)
+                if order.get('status') in FINAL_ORDER_STATES:
+                    outcome = order_outcome(order['status'], order.get('avgPrice'), order.get('executedQty'),
+                                            order.get('updateTime'))
+            except Exception as e:
+                logger.warning("Could not look up order %s of slave %s: %s", client_order_id, slave_id, e)
+        if outcome is None:
+            outcome = {"status": "unconfirmed", "error": "Fill not confirmed"}
+        trade_record.update(outcome)
+        complete_trade(client_order_id, outcome)
+    
+    await asyncio.gather(*(resolve(client_order_id, record) for client_order_id, record in records.items()))
+
+def confirm_fill(order_data: Dict):
+    """Complete the trade record of a copied order from the slave's ORDER_TRADE_UPDATE"""
+    client_order_id = order_data.get('c', '')
+    if order_data.get('X') not in FINAL_ORDER_STATES or not client_order_id.startswith(CLIENT_ORDER_ID_PREFIX):
+        return
+    outcome = order_outcome(order_data['X'], order_data.get('ap'), order_data.get('z'), order_data.get('T'))
+    trade_record = pending_fills.pop(client_order_id, None)
+    if trade_record is None:
+        # The stream beat the ack; keep the outcome for save_slave_trade
+        early_fills[client_order_id] = outcome
+        if len(early_fills) > SEEN_FILLS_PER_MASTER:
+            del early_fills[next(iter(early_fills))]
+        return
+    trade_record.update(outcome)
+    complete_trade(client_order_id, outcome)
+    logger.debug("Fill of %s confirmed: %s @ %s", client_order_id, outcome.get('quantity'), outcome.get('price'))
+
+def handle_slave_message(msg: Dict, slave_id: str):
+    """Keep the slave's position book and balance current and confirm fills of copied orders"""
+    position_book.apply_message(slave_id, msg)
+    if msg.get('e') == 'ORDER_TRADE_UPDATE':
+        confirm_fill(msg['o'])
+    elif msg.get('e') == 'ACCOUNT_UPDATE':
+        balance = balance_from_account_update(msg)
+        if balance is not None:
+            account_balances[slave_id] = balance
+
+async def place_slave_order(slave_id: str, client: AsyncClient, order_params: Dict, position_side: str) -> Dict:
+    """Send a slave order and apply it to the slave's position book as soon as it is acked
+
+    The slave's own fill is streamed only after the ack; until then the next
+    copy on the same symbol would size its closes from a stale position. An
+    order rejected for its timestamp (-1021) never reached the matching
+    engine, so it is sent once more, with the same id, after a clock sync.
+    """
+    client_order_id = order_params['newClientOrderId']
+    position_book.expect_order(slave_id, client_order_id, order_params['symbol'], position_side,
+                               order_params['side'])
+    tracker = ack_latency.setdefault(slave_id, AckLatencyTracker())
+    
+    def send():
+        order_params['recvWindow'] = server_clock.recv_window_ms(tracker.percentile(99))
+        return submit_order(order_clients.get(slave_id, client), order_params, tracker,
+                            hedge_connections.get(slave_id), server_clock)
+    
+    try:
+        try:
+            order = await send()
+        except BinanceAPIException as e:
+            if e.code != TIMESTAMP_ERROR:
+                raise
+            logger.warning("Order %s rejected for its timestamp, resending after a clock sync", client_order_id)
+            await server_clock.resync(get_clock_client())
+            order = await send()
+    except BaseException:
+        position_book.discard_order(slave_id, client_order_id)
+        raise
+    if order.get('status') in FINAL_ORDER_STATES:
+        quantity = float(order.get('executedQty', 0))
+    else:
+        quantity = float(order_params['quantity'])
+    position_book.apply_order_ack(slave_id, client_order_id, quantity)
+    return order
+
+async def plan_slave_orders(slave: Dict, client: AsyncClient, symbol: str, side: str, quantity: float,
+                            master_position: Optional[Tuple[float, float]]) -> List[Dict]:
+    """Orders that keep a slave proportional to the master after a master fill"""
+    slave_id = slave['id']
+    hedge_mode = await get_position_mode(slave_id, client)
+    
+    if master_position is None or not position_book.is_known(slave_id):
+        # No position context: size the whole fill as new exposure
+        slave_qty = await calculate_slave_quantity(slave, quantity, symbol, client)
+        direction = 'LONG' if side == 'BUY' else 'SHORT'
+        return [{"side": side, "quantity": slave_qty, "reduce_only": False, "direction": direction}]
+    
+    close_fraction, close_dir, open_qty, open_dir = plan_copy(*master_position)
+    legs = []
+    
+    if close_fraction:
+        # Close the same fraction of the slave's position as the master closed
+        slave_amount = position_book.get(slave_id, symbol, close_dir if hedge_mode else 'BOTH')
+        if direction_of(slave_amount) == close_dir:
+            if close_fraction >= 1:
+                close_qty = abs(slave_amount)
+            else:
+                step_size = symbol_filters.get(symbol, {}).get('step_size', '0.001')
+                close_qty = round_to_step(abs(slave_amount) * close_fraction, step_size)
+            legs.append({"side": 'SELL' if close_dir == 'LONG' else 'BUY', "quantity": close_qty,
+                         "reduce_only": True, "direction": close_dir})
+    
+    if open_qty:
+        slave_qty = await calculate_slave_quantity(slave, open_qty, symbol, client)
+        legs.append({"side": 'BUY' if open_dir == 'LONG' else 'SELL', "quantity": slave_qty,
+                     "reduce_only": False, "direction": open_dir})
+    
+    return [leg for leg in legs if leg['quantity'] > 0]
+
+async def copy_to_slaves(trade_data: Dict, master_id: str,
+                         master_position: Optional[Tuple[float, float]] = None,
+                         received: Optional[float] = None):
+    """Copy master trade to all active slaves
+
+    master_position is the master's (before, after) position for this order;
+    with it, closes and reversals are copied proportionally to each slave's
+    own position instead of being sized as new trades. received is when the
+    fill arrived (perf_counter), so time spent on a dispatch lane counts
+    towards the tier latency.
+    """
+    if trade_data['e'] != 'ORDER_TRADE_UPDATE':
+        return
+    
+    order_data = trade_data['o']
+    if order_data['X'] != 'FILLED':
+        return
+    if received is None:
+        received = time.perf_counter()
+    
+    # Never copy the same master fill twice (reconnects, restarts)
+    if not is_new_fill(master_id, f"{order_data.get('i')}:{order_data.get('t', trade_data.get('E'))}"):
+        logger.info("Ignoring already copied fill of master %s order %s", master_id, order_data.get('i'))
+        return
+    
+    symbol = order_data['s']
+    side = order_data['S']
+    quantity = float(order_data['q'])
+    price = float(order_data['ap'])
+    master_order_id = order_data.get('i')
+    fill_seq = order_data.get('t', trade_data.get('E'))
+    # Master side of every record, for slippage and latency analytics
+    master_fields = {
+        "master_price": price,
+        "master_event_time": trade_data.get('E'),
+        "master_trade_time": order_data.get('T', trade_data.get('T'))
+    }
+    
+    logger.info("Master %s executed: %s %s %s @ %s", master_id, side, quantity, symbol, price,
+                extra={"master_id": master_id, "order_id": master_order_id})
+    
+    # Copy to each slave, highest tier and fastest first
+    slaves = [acc for acc in registered_accounts() if acc['type'] == 'slave' and acc['active']]
+    slaves = dispatch_scheduler.order(slaves, ack_latency_p50)
+    
+    for slave in slaves:
+        slave_id = slave['id']
+        slave_client = active_connections.get(slave_id)
+        tier = dispatch_scheduler.tier_of(slave)
+        
+        if not slave_client:
+            continue
+        
+        # Quarantined slaves are skipped without any request or delay
+        breaker = get_circuit_breaker(slave_id)
+        if not breaker.allow():
+            logger.debug("Skipping quarantined slave %s", slave_id)
+            continue
+        
+        inflight_orders[slave_id] = inflight_orders.get(slave_id, 0) + 1
+        leg = {"side": side, "quantity": 0, "reduce_only": False}
+        dispatched_at = None
+        client_order_id = make_client_order_id(master_order_id, fill_seq, slave_id)
+        try:
+            legs = await plan_slave_orders(slave, slave_client, symbol, side, quantity, master_position)
+            if master_position is not None and position_book.is_known(slave_id):
+                # What this slave should hold from now on, whether or not the orders go through
+                open_quantity = sum(leg['quantity'] for leg in legs if not leg['reduce_only'])
+                reconciler.record_copy(master_id, slave_id, symbol, master_position, open_quantity)
+            
+            if not legs:
+                logger.warning("Skipping trade for slave %s: calculated quantity is 0", slave_id)
+                continue
+            
+            hedge_mode = await get_position_mode(slave_id, slave_client)
+            # Without a stream to confirm the fill, wait for the full order result
+            ack_only = ORDER_ACK_RESPONSES and slave_id in streaming_slaves
+            for index, leg in enumerate(legs):
+                # A reversal has a close and an open leg, each with its own id
+                leg_seq = fill_seq if index == 0 else f"{fill_seq}.{index}"
+                client_order_id = make_client_order_id(master_order_id, leg_seq, slave_id)
+                
+                # Place slave order
+                order_params = {
+                    'symbol': symbol,
+                    'side': leg['side'],
+                    'type': 'MARKET',
+                    'quantity': leg['quantity'],
+                    'newClientOrderId': client_order_id
+                }
+                if hedge_mode:
+                    # In hedge mode the position side says which position is opened or closed
+                    order_params['positionSide'] = leg['direction']
+                elif leg['reduce_only']:
+                    order_params['reduceOnly'] = 'true'
+                if ack_only:
+                    order_params['newOrderRespType'] = 'ACK'
+                
+                await dispatch_scheduler.acquire(tier)
+                dispatched_at = server_clock.now_ms()
+                order = await place_slave_order(slave_id, slave_client, order_params,
+                                                leg['direction'] if hedge_mode else 'BOTH')
+                acked_at = server_clock.now_ms()
+                dispatch_scheduler.record(tier, time.perf_counter() - received)
+                
+                # Record accepted trade
+                trade_record = {
+                    "timestamp": datetime.now().isoformat(),
+                    "master_id": master_id,
+                    "slave_id": slave_id,
+                    "symbol": symbol,
+                    "side": leg['side'],
+                    "quantity": leg['quantity'],
+                    "price": float(order.get('avgPrice', price)),
+                    "status": "success",
+                    "error": None,
+                    "client_order_id": client_order_id,
+                    "reduce_only": leg['reduce_only'],
+                    **master_fields,
+                    "dispatched_at": dispatched_at,
+                    "acked_at": acked_at
+                }
+                save_slave_trade(trade_record, order)
+                breaker.record_success()
+                logger.info("Slave %s copied: %s %s %s", slave_id, leg['side'], leg['quantity'], symbol,
+                            extra={"client_order_id": client_order_id, "reduce_only": leg['reduce_only']})
+            
+        except BinanceAPIException as e:
+            # Record failed trade
+            trade_record = {
+                "timestamp": datetime.now().isoformat(),
+                "master_id": master_id,
+                "slave_id": slave_id,
+                "symbol": symbol,
+                "side": leg['side'],
+                "quantity": leg['quantity'],
+                "price": price,
+                "status": "failed",
+                "error": str(e),
+                "client_order_id": client_order_id,
+                "reduce_only": leg['reduce_only'],
+                **master_fields,
+                "dispatched_at": dispatched_at
+            }
+            save_trade(trade_record)
+            record_copy_failure(slave_id, e)
+            logger.error("Failed to copy trade to slave %s: %s", slave_id, e,
+                         extra={"client_order_id": client_order_id})
+        except Exception as e:
+            record_copy_failure(slave_id, e)
+            # Traceback is formatted by the log writer thread, not here
+            logger.exception("Unexpected error copying to slave %s", slave_id)
+        finally:
+            inflight_orders[slave_id] -= 1
+            # A probe that placed no order leaves the slave to the next copy
+            breaker.release_probe()
+
+async def monitor_master(master_id: str, api_key: str, api_secret: str,
+                         stream_ready: Optional[asyncio.Event] = None):
+    """Monitor master account for trades"""
+    global copying_active
+    
+    recorder = None
+    stop_event = master_stop_events[master_id] = asyncio.Event()
+    try:
+        # Reuse the client connected during startup, if any
+        client = active_connections.get(master_id)
+        if client is None:
+            client = await create_client(api_key, api_secret)
+            active_connections[master_id] = client
+        
+        if RECORD_STREAMS:
+            recorder = StreamRecorder.for_master(master_id)
+            logger.info("Recording master %s stream to %s", master_id, recorder.path)
+        
+        bm = BinanceSocketManager(client)
+        socket_managers[master_id] = bm
+        
+        # Start user data stream
+        async with bm.futures_user_socket() as stream:
+            logger.info("Started monitoring master %s", master_id)
+            if master_id in stream_cursors:
+                gap = time.time() - stream_cursors[master_id] / 1000
+                logger.info("Master %s stream resumed, last event was %.1fs ago", master_id, gap)
+            if stream_ready:
+                stream_ready.set()
+            
+            while copying_active and not stop_event.is_set():
+                try:
+                    msg = await asyncio.wait_for(stream.recv(), timeout=30)
+                    if recorder:
+                        recorder.record(master_id, msg)
+                    if 'E' in msg:
+                        stream_cursors[master_id] = msg['E']
+                    # Copies run on the symbol lanes; the stream keeps reading
+                    handle_master_message(msg, master_id)
+                except asyncio.TimeoutError:
+                    continue
+                except Exception as e:
+                    logger.error("Error in master stream %s: %s", master_id, e)
+                    break
+        
+    except Exception as e:
+        logger.error("Failed to connect master %s: %s", master_id, e)
+    finally:
+        if recorder:
+            recorder.close()
+            logger.info("Recorded %s messages from master %s", recorder.count, master_id)
+        if master_id in active_connections:
+            await active_connections[master_id].close_connection()
+            del active_connections[master_id]
+        if master_id in socket_managers:
+            del socket_managers[master_id]
+        copier_tasks.pop(master_id, None)
+        master_stop_events.pop(master_id, None)
+
+async def refresh_positions(account_id: str):
+    """Reload an account's positions over REST, at most every RECONCILE_REFRESH_INTERVAL"""
+    client = active_connections.get(account_id)
+    if not client or not position_book.is_known(account_id):
+        # Accounts without a live stream are not tracked
+        return
+    if time.monotonic() - positions_refreshed_at.get(account_id, 0) < RECONCILE_REFRESH_INTERVAL:
+        return
+    positions_refreshed_at[account_id] = time.monotonic()
+    sent_at = int(time.time() * 1000 + getattr(client, 'timestamp_offset', 0))
+    # One weighted call returns every symbol of the account
+    positions = await client.futures_position_information()
+    position_book.load_positions(account_id, positions, as_of=sent_at)
+    reconciler.position_refreshes += 1
+
+async def correct_drift(slave_id: str, drift: Dict):
+    """Place one order that moves a slave's position towards the expected one"""
+    client = active_connections[slave_id]
+    symbol = drift['symbol']
+    expected, actual = drift['expected'], drift['actual']
+    step_size = symbol_filters.get(symbol, {}).get('step_size', '0.001')
+    
+    if actual and direction_of(actual) != direction_of(expected):
+        # Wrong direction: close it, a later check opens the expected side
+        direction, quantity, reduce_only = direction_of(actual), abs(actual), True
+    elif abs(expected) < abs(actual):
+        direction, quantity, reduce_only = direction_of(actual), abs(actual) - abs(expected), True
+    else:
+        direction, quantity, reduce_only = direction_of(expected), abs(expected) - abs(actual), False
+    quantity = round_to_step(quantity, step_size)
+    if quantity <= 0:
+        return
+    
+    if reduce_only:
+        side = 'SELL' if direction == 'LONG' else 'BUY'
+    else:
+        side = 'BUY' if direction == 'LONG' else 'SELL'
+    client_order_id = make_client_order_id(f"reconcile-{symbol}", int(time.time() * 1000), slave_id)
+    order_params = {
+        'symbol': symbol,
+        'side': side,
+        'type': 'MARKET',
+        'quantity': quantity,
+        'newClientOrderId': client_order_id
+    }
+    hedge_mode = await get_position_mode(slave_id, client)
+    if hedge_mode:
+        order_params['positionSide'] = direction
+    elif reduce_only:
+        order_params['reduceOnly'] = 'true'
+    
+    breaker = get_circuit_breaker(slave_id)
+    trade_record = {
+        "timestamp": datetime.now().isoformat(),
+        "master_id": "reconciler",
+        "slave_id": slave_id,
+        "symbol": symbol,
+        "side": side,
+        "quantity": quantity,
+        "client_order_id": client_order_id,
+        "reduce_only": reduce_only
+    }
+    try:
+        order = await place_slave_order(slave_id, client, order_params, direction if hedge_mode else 'BOTH')
+        save_trade({**trade_record, "price": float(order.get('avgPrice', 0)), "status": "success", "error": None})
+        breaker.record_success()
+        reconciler.corrections += 1
+        logger.warning("Corrected drift of slave %s: %s %s %s", slave_id, side, quantity, symbol,
+                       extra={"expected": expected, "actual": actual})
+    except Exception as e:
+        save_trade({**trade_record, "price": 0.0, "status": "failed", "error": str(e)})
+        record_copy_failure(slave_id, e)
+        logger.error("Failed to correct drift of slave %s on %s: %s", slave_id, symbol, e)
+    finally:
+        reconciler.clear_suspect(slave_id, symbol)
+
+async def reconcile_positions():
+    """Compare every slave with its masters and correct confirmed drift"""
+    slaves = [acc['id'] for acc in registered_accounts() if acc['type'] == 'slave' and acc['active']]
+    for slave_id in slaves:
+        masters = reconciler.masters_of(slave_id)
+        if not masters or slave_id not in active_connections:
+            continue
+        if inflight_orders.get(slave_id) or any(dispatching_masters.get(m) for m in masters):
+            # A copy is in progress; positions are about to change
+            continue
+        
+        for account_id in [slave_id] + masters:
+            try:
+                await refresh_positions(account_id)
+            except Exception as e:
+                logger.warning("Position refresh failed for %s: %s", account_id, e)
+        
+        for drift in reconciler.find_drift(position_book, slave_id):
+            logger.warning("Position drift on slave %s %s: expected %s, actual %s", slave_id, drift['symbol'],
+                           drift['expected'], drift['actual'])
+            breaker = get_circuit_breaker(slave_id)
+            if DRIFT_CORRECTION and breaker.allow():
+                try:
+                    await correct_drift(slave_id, drift)
+                finally:
+                    breaker.release_probe()
+    reconciler.finish_check()
+
+async def reconcile_loop():
+    """Periodically reconcile slave positions while copying is active"""
+    while copying_active:
+        await asyncio.sleep(RECONCILE_INTERVAL)
+        if not system_ready:
+            continue
+        try:
+            await reconcile_positions()
+        except Exception:
+            logger.exception("Position reconciliation failed")
+
+async def monitor_slave(slave_id: str, stream_ready: Optional[asyncio.Event] = None):
+    """Follow a slave's user-data stream to keep its position book current"""
+    try:
+        bm = BinanceSocketManager(active_connections[slave_id])
+        async with bm.futures_user_socket() as stream:
+            streaming_slaves.add(slave_id)
+            if stream_ready:
+                stream_ready.set()
+            
+            while copying_active:
+                try:
+                    msg = await asyncio.wait_for(stream.recv(), timeout=30)
+                except asyncio.TimeoutError:
+                    continue
+                handle_slave_message(msg, slave_id)
+    except Exception as e:
+        logger.error("Error in slave stream %s: %s", slave_id, e)
+    finally:
+        # A stream replaced by a newer one (the slave was re-attached) leaves its state alone
+        if slave_stream_tasks.get(slave_id) is asyncio.current_task():
+            # Without its stream the slave's book goes stale; fall back to plain sizing
+            streaming_slaves.discard(slave_id)
+            position_book.forget(slave_id)
+            slave_stream_tasks.pop(slave_id, None)
+            # Fills of these can no longer be confirmed by the stream
+            leftover = [c for c, t in pending_fills.items() if t['slave_id'] == slave_id]
+            if leftover:
+                await resolve_pending_fills(slave_id, {c: pending_fills.pop(c) for c in leftover})
+
+async def open_slave_stream(slave_id: str) -> bool:
+    """Start a slave's stream task and wait until the stream is open"""
+    stream_ready = asyncio.Event()
+    task = asyncio.create_task(monitor_slave(slave_id, stream_ready))
+    slave_stream_tasks[slave_id] = task
+    
+    ready_wait = asyncio.create_task(stream_ready.wait())
+    await asyncio.wait({task, ready_wait}, timeout=STARTUP_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+    if not stream_ready.is_set():
+        ready_wait.cancel()
+        task.cancel()
+        logger.warning("Stream of slave %s did not open, closes will be sized as new trades", slave_id)
+        return False
+    return True
+
+async def connect_slave(slave_id: str, api_key: str, api_secret: str, order_transport: str = "rest") -> bool:
+    """Connect slave account"""
+    try:
+        client = await create_client(api_key, api_secret)
+        # Checks connectivity and opens the connection orders will use
+        await client.futures_ping()
+        active_connections[slave_id] = client
+        if HEDGED_ORDERS:
+            # Separate client, hence separate HTTP session and TCP connection
+            hedge_connections[slave_id] = await create_client(api_key, api_secret)
+        if order_transport == "ws":
+            order_client = order_clients[slave_id] = WsOrderClient(client, api_key, api_secret)
+            try:
+                await order_client.connect()
+            except Exception as e:
+                # Orders use REST until the socket can be opened
+                logger.warning("WebSocket API unavailable for slave %s, using REST: %s", slave_id, e)
+        logger.info("Connected slave %s", slave_id)
+        return True
+    except Exception as e:
+        logger.error("Failed to connect slave %s: %s", slave_id, e)
+        return False
+
+async def connect_master(master_id: str, api_key: str, api_secret: str) -> bool:
+    """Connect master account client ahead of opening its stream"""
+    try:
+        client = await create_client(api_key, api_secret)
+        await client.futures_ping()
+        active_connections[master_id] = client
+        logger.info("Connected master %s", master_id)
+        return True
+    except Exception as e:
+        logger.error("Failed to connect master %s: %s", master_id, e)
+        return False
+
+async def get_position_mode(account_id: str, client: AsyncClient) -> bool:
+    """Return True if the account is in hedge (dual side) mode, using the warm-up cache"""
+    if account_id not in position_modes:
+        position_mode = await client.futures_get_position_mode()
+        position_modes[account_id] = position_mode.get('dualSidePosition', False)
+    return position_modes[account_id]
+
+async def warm_account(account_id: str):
+    """Prefetch per-account state used on the copy path"""
+    client = active_connections[account_id]
+    # Trades streamed from here on are not yet part of the loaded positions
+    sent_at = server_clock.now_ms()
+    position_mode, account_info = await asyncio.gather(
+        client.futures_get_position_mode(),
+        client.futures_account()
+    )
+    position_modes[account_id] = position_mode.get('dualSidePosition', False)
+    account_balances[account_id] = balance_from_account_info(account_info)
+    position_book.load_positions(account_id, account_info.get('positions', []), as_of=sent_at)
+
+async def revalidate_account(account_id: str):
+    """Warm a connected account in the background, retrying until it succeeds
+
+    Until its positions are loaded, closes are sized as new trades and drift
+    is not checked for the account. Stops once the account's client is
+    closed or replaced.
+    """
+    client = active_connections.get(account_id)
+    while copying_active and client is not None and active_connections.get(account_id) is client:
+        try:
+            await warm_account(account_id)
+            restored_accounts.discard(account_id)
+            return
+        except Exception as e:
+            logger.warning("Warm-up of %s failed, retrying in %ss: %s", account_id, WARMUP_RETRY_INTERVAL, e)
+        await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+
+async def start_account(account: Dict, started: float) -> bool:
+    """Connect and warm one account, recording its time-to-ready"""
+    account_id = account['id']
+    account_readiness[account_id] = {"type": account['type'], "ready": False, "stage": "connecting"}
+    
+    if account['type'] == 'master':
+        connected = await connect_master(account_id, account['api_key'], account['api_secret'])
+    else:
+        connected = await connect_slave(account_id, account['api_key'], account['api_secret'],
+                                        account.get('order_transport', 'rest'))
+    if not connected:
+        account_readiness[account_id].update(stage="failed", error="connection failed")
+        return False
+    
+    if account_id in restored_accounts:
+        # Warm state came from the snapshot: be ready now, revalidate meanwhile
+        run_in_background(revalidate_account(account_id))
+    else:
+        try:
+            account_readiness[account_id]["stage"] = "warming"
+            await warm_account(account_id)
+        except Exception as e:
+            # Caches fill lazily on the copy path; the account is still usable
+            # and its positions are loaded by a background retry
+            logger.warning("Warm-up failed for %s: %s", account_id, e)
+            run_in_background(revalidate_account(account_id))
+    
+    if account['type'] == 'slave':
+        account_readiness[account_id]["stage"] = "streaming"
+        await open_slave_stream(account_id)
+        account_readiness[account_id].update(
+            ready=True, stage="ready", time_to_ready=round(time.perf_counter() - started, 3)
+        )
+    return True
+
+async def open_master_stream(master: Dict, started: float) -> bool:
+    """Start a master's stream task and wait until the stream is open"""
+    master_id = master['id']
+    account_readiness[master_id]["stage"] = "streaming"
+    stream_ready = asyncio.Event()
+    task = asyncio.create_task(monitor_master(
+        master_id, master['api_key'], master['api_secret'], stream_ready
+    ))
+    copier_tasks[master_id] = task
+    
+    ready_wait = asyncio.create_task(stream_ready.wait())
+    await asyncio.wait({task, ready_wait}, timeout=STARTUP_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+    if not stream_ready.is_set():
+        ready_wait.cancel()
+        account_readiness[master_id].update(stage="failed", error="stream did not open")
+        return False
+    
+    account_readiness[master_id].update(
+        ready=True, stage="ready", time_to_ready=round(time.perf_counter() - started, 3)
+    )
+    return True
+
+async def attach_account(account: Dict) -> bool:
+    """Connect one account into the running copier without touching the others"""
+    started = time.perf_counter()
+    if not await start_account(account, started):
+        return False
+    if account['type'] == 'master':
+        return await open_master_stream(account, started)
+    return True
+
+async def detach_account(account_id: str):
+    """Drain and disconnect one account while the others keep copying"""
+    task = copier_tasks.get(account_id)
+    if task:
+        # Master: stop reading the stream; fills already queued on the lanes are
+        # still copied, as copies only need the slave clients
+        master_stop_events[account_id].set()
+        task.cancel()
+        await asyncio.wait({task}, timeout=DETACH_TIMEOUT)
+        deadline = time.monotonic() + DETACH_TIMEOUT
+        while dispatching_masters.get(account_id) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if dispatching_masters.get(account_id):
+            logger.warning("Master %s did not drain within %ss", account_id, DETACH_TIMEOUT)
+    else:
+        # Slave: let orders already being placed complete
+        deadline = time.monotonic() + DETACH_TIMEOUT
+        while inflight_orders.get(account_id) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if account_id in slave_stream_tasks:
+            await cancel_tasks([slave_stream_tasks[account_id]])
+    
+    if account_id in active_connections:
+        await active_connections.pop(account_id).close_connection()
+    if account_id in hedge_connections:
+        await hedge_connections.pop(account_id).close_connection()
+    if account_id in order_clients:
+        await order_clients.pop(account_id).close_connection()
+    for cache in (position_modes, account_balances, circuit_breakers, ack_latency, account_readiness):
+        cache.pop(account_id, None)
+    position_book.forget(account_id)
+    reconciler.forget(account_id)
+    positions_refreshed_at.pop(account_id, None)
+    logger.info("Detached account %s", account_id)
+
+# Quantity calculation function
+async def calculate_slave_quantity(slave_account: Dict, master_quantity: float, symbol: str, client: AsyncClient) -> float:
+    """Calculate the appropriate quantity for a slave account based on risk management"""
+    try:
+        # Get slave account balance, kept current by its stream when it has one
+        slave_id = slave_account['id']
+        if slave_id in streaming_slaves and slave_id in account_balances:
+            balance = account_balances[slave_id]
+        else:
+            account_info = await client.futures_account()
+            balance = balance_from_account_info(account_info)
+        
+        # Get current price
+        ticker = await client.futures_symbol_ticker(symbol=symbol)
+        current_price = float(ticker['price'])
+        
+        # Calculate position value
+        master_position_value = master_quantity * current_price
+        
+        # Apply risk percentage
+        risk_percentage = slave_account.get('risk_percentage', 1.0) / 100.0
+        max_position_value = balance * risk_percentage
+        
+        # Calculate slave quantity
+        if master_position_value > max_position_value:
+            # Scale down to match risk limit
+            slave_quantity = max_position_value / current_price
+        else:
+            # Use same quantity as master
+            slave_quantity = master_quantity
+        
+        # Round to the symbol's step size (3 decimals if filters are not loaded)
+        filters = symbol_filters.get(symbol, {})
+        step_size = filters.get('step_size', '0.001')
+        slave_quantity = round_to_step(slave_quantity, step_size)
+        
+        # Check minimum notional value (default $20 if filters are not loaded)
+        min_notional = filters.get('min_notional', 20.0)
+        if slave_quantity * current_price < min_notional:
+            logger.warning("Calculated quantity %s is below minimum notional $%s", slave_quantity, min_notional)
+            slave_quantity = round_to_step(min_notional / current_price * 1.1, step_size, up=True)  # Add 10% buffer
+        
+        logger.info("Calculated slave quantity: %s (master: %s)", slave_quantity, master_quantity)
+        return slave_quantity
+        
+    except BinanceAPIException:
+        # Account-level API errors go to the caller's circuit breaker
+        raise
+    except Exception as e:
+        logger.error("Error calculating slave quantity: %s", e)
+        # Return 0 to skip this trade
+        return 0
+
+# Lifecycle
+async def startup(resume: bool = RESUME_ON_STARTUP):
+    """Bootstrap data files and state, and start the background loops"""
+    ensure_data_files()
+    load_recent_trades()
+    restore_state(load_snapshot())
+    run_in_background(snapshot_loop())
+    run_in_background(server_clock.run(get_clock_client()))
+    logger.info("Binance Trade Copier started")
+    
+    with open(SYSTEM_FILE, 'r') as f:
+        was_copying = json.load(f).get('copying_active', False)
+    if resume and was_copying:
+        logger.info("Resuming copy trading from the previous run")
+        run_in_background(start_copying())
+
+async def shutdown():
+    """Save the state snapshot and close every connection"""
+    global copying_active
+    copying_active = False
+    
+    # Let fills already received be copied before the connections close
+    if not await dispatch_lanes.drain(DETACH_TIMEOUT):
+        logger.warning("%s queued fill(s) not copied before shutdown", dispatch_lanes.pending())
+    dispatch_lanes.close()
+    
+    try:
+        save_snapshot(collect_state())
+    except Exception as e:
+        logger.error("Failed to save state snapshot: %s", e)
+    
+    # Close all connections
+    await close_clients()
+    if clock_client is not None:
+        await clock_client.close_connection()
+    try:
+        flush_trade_updates()
+    except Exception as e:
+        logger.error("Failed to write the trade log: %s", e)
+    
+    logger.info("System shutdown complete")
+
+async def start_copying():
+    """Start copy trading"""
+    global copying_active, system_ready, reconcile_task
+    
+    if copying_active:
+        return {"message": "Copying already active"}
+    
+    copying_active = True
+    system_ready = False
+    account_readiness.clear()
+    update_system_state(True)
+    started = time.perf_counter()
+    
+    # Pick up any manual edits of accounts.json
+    account_registry.clear()
+    accounts = registered_accounts()
+    masters = [acc for acc in accounts if acc['type'] == 'master' and acc['active']]
+    slaves = [acc for acc in accounts if acc['type'] == 'slave' and acc['active']]
+    
+    # Exchange filters are loaded alongside the accounts; snapshot ones are
+    # used right away and refreshed in the background
+    had_filters = bool(symbol_filters)
+    filters_task = run_in_background(refresh_symbol_filters())
+    
+    # Connect and warm every account at the same time
+    connected = await asyncio.gather(*(start_account(acc, started) for acc in masters + slaves))
+    if not had_filters:
+        await filters_task
+    
+    # Open master streams only once all slaves can receive copies
+    connected_masters = [m for m, ok in zip(masters, connected) if ok]
+    await asyncio.gather(*(open_master_stream(m, started) for m in connected_masters))
+    
+    system_ready = copying_active
+    if reconcile_task is None or reconcile_task.done():
+        reconcile_task = run_in_background(reconcile_loop())
+    failed = [acc_id for acc_id, state in account_readiness.items() if not state['ready']]
+    logger.info("Copy trading ready in %.3fs (%s account(s) failed)", time.perf_counter() - started, len(failed))
+    
+    return {
+        "message": "Copy trading started",
+        "ready": system_ready,
+        "time_to_ready": round(time.perf_counter() - started, 3),
+        "failed_accounts": failed,
+        "readiness": account_readiness
+    }
+
+async def close_clients():
+    """Close and forget every account's API, hedge and order clients"""
+    for clients in (active_connections, hedge_connections, order_clients):
+        for client in clients.values():
+            await client.close_connection()
+        clients.clear()
+
+async def stop_copying():
+    """Stop copy trading"""
+    global copying_active, system_ready
+    
+    copying_active = False
+    system_ready = False
+    update_system_state(False)
+    
+    # Stop the master streams (each closes its client), then let fills already
+    # received be copied
+    await cancel_tasks(list(copier_tasks.values()))
+    if not await dispatch_lanes.drain(DETACH_TIMEOUT):
+        logger.warning("%s queued fill(s) still being copied after stop", dispatch_lanes.pending())
+    
+    # A later start opens new streams and clients; the old ones must not
+    # keep running next to them
+    tasks = list(slave_stream_tasks.values())
+    if reconcile_task is not None:
+        tasks.append(reconcile_task)
+    await cancel_tasks(tasks)
+    await close_clients()
+    streaming_slaves.clear()
+    
+    return {"message": "Copy trading stopped"}
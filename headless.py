@@ -0,0 +1,93 @@
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import sys
+from typing import Dict, Optional
+
+import copier
+
+IMPORTED = time.perf_counter()
+WEB_MODULES = ("fastapi", "starlette", "jinja2", "uvicorn", "pydantic")
+
+logger = logging.getLogger(__name__)
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process, None where it cannot be read"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def startup_report(result: Dict) -> Dict:
+    """Startup time and memory of the headless copier"""
+    return {
+        "import_s": round(IMPORTED - STARTED, 3),
+        "time_to_ready_s": result.get("time_to_ready"),
+        "total_s": round(time.perf_counter() - STARTED, 3),
+        "peak_memory_mb": peak_memory_mb(),
+        "modules_loaded": len(sys.modules),
+        "web_modules_loaded": [name for name in WEB_MODULES if name in sys.modules],
+        "ready": result.get("ready", False),
+        "failed_accounts": result.get("failed_accounts", []),
+    }
+
+
+async def run(args):
+    await copier.startup(resume=False)
+    result = await copier.start_copying()
+    report = startup_report(result)
+    logger.info("Headless copier ready: %s", json.dumps(report))
+    if args.startup_report:
+        print(json.dumps(report, indent=2))
+        # A measurement run must not leave copying on for the next boot to resume
+        await copier.stop_copying()
+        await copier.shutdown()
+        return
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):  # Windows: Ctrl+C raises KeyboardInterrupt instead
+            pass
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Stopping headless copier")
+        await copier.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run the copy engine without the web interface (accounts from data/accounts.json)"
+    )
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print startup time and memory once ready, then exit")
+    parser.add_argument("--log-level", help="Override LOG_LEVEL from config.py")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.log_level:
+        logging.getLogger().setLevel(args.log_level)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+import zlib
+from collections import deque
+from typing import Coroutine, Dict, Optional
+
+from config import DISPATCH_LANES, LANE_DEPTH_WARNING
+from orders import AckLatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class Lane:
+    """FIFO of copies for one symbol (or symbol hash), run one at a time"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.queue = deque()  # (coroutine, future, enqueued_at)
+        self.worker: Optional[asyncio.Task] = None
+        self.running = False
+        self.processed = 0
+        self.max_depth = 0
+        self.warned = False
+        self.wait = AckLatencyTracker(window=500)  # Seconds fills waited on the lane
+
+    @property
+    def depth(self) -> int:
+        """Copies queued or running"""
+        return len(self.queue) + self.running
+
+
+class DispatchLanes:
+    """Copies master fills on a lane per symbol: in order within a symbol, in parallel across symbols
+
+    A burst of fills on one market then only queues behind itself instead of
+    delaying every other symbol. A lane's worker exits once its queue is empty
+    and is started again by the next fill.
+    """
+
+    def __init__(self, lane_count: int = DISPATCH_LANES, depth_warning: int = LANE_DEPTH_WARNING):
+        self.lane_count = lane_count
+        self.depth_warning = depth_warning
+        self.lanes: Dict[str, Lane] = {}
+
+    def lane_key(self, symbol: str) -> str:
+        if self.lane_count <= 0:
+            return symbol
+        # Stable across restarts, unlike hash()
+        return f"lane-{zlib.crc32(symbol.encode()) % self.lane_count}"
+
+    def submit(self, symbol: str, coro: Coroutine) -> asyncio.Future:
+        """Queue a copy on the symbol's lane; the future resolves once it ran"""
+        key = self.lane_key(symbol)
+        lane = self.lanes.get(key)
+        if lane is None:
+            lane = self.lanes[key] = Lane(key)
+        future = asyncio.get_running_loop().create_future()
+        lane.queue.append((coro, future, time.perf_counter()))
+
+        depth = lane.depth
+        lane.max_depth = max(lane.max_depth, depth)
+        if depth >= self.depth_warning and not lane.warned:
+            lane.warned = True
+            logger.warning("Dispatch lane %s is %s fills deep", key, depth)
+
+        if lane.worker is None or lane.worker.done():
+            lane.worker = asyncio.create_task(self._run(lane))
+        return future
+
+    async def _run(self, lane: Lane):
+        while lane.queue:
+            coro, future, enqueued_at = lane.queue.popleft()
+            lane.wait.record(time.perf_counter() - enqueued_at)
+            lane.running = True
+            try:
+                await coro
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception:
+                logger.exception("Copy failed on dispatch lane %s", lane.key)
+            finally:
+                lane.running = False
+                lane.processed += 1
+                if not future.done():
+                    future.set_result(None)
+            if lane.depth < self.depth_warning // 2:
+                lane.warned = False
+
+    def pending(self) -> int:
+        """Copies queued or running on all lanes"""
+        return sum(lane.depth for lane in self.lanes.values())
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every queued copy; False on timeout"""
+        workers = {lane.worker for lane in self.lanes.values() if lane.worker and not lane.worker.done()}
+        if not workers:
+            return True
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        return not pending
+
+    def close(self):
+        """Cancel the workers and drop queued copies"""
+        for lane in self.lanes.values():
+            if lane.worker:
+                lane.worker.cancel()
+            while lane.queue:
+                coro, future, _ = lane.queue.popleft()
+                coro.close()
+                future.cancel()
+
+    def snapshot(self) -> Dict:
+        """Lane depths and queue waits for the API"""
+        lanes = {}
+        for key, lane in sorted(self.lanes.items()):
+            p50, p99 = lane.wait.percentile(50), lane.wait.percentile(99)
+            lanes[key] = {
+                "depth": lane.depth,
+                "max_depth": lane.max_depth,
+                "processed": lane.processed,
+                "wait_ms": {
+                    "p50": round(p50 * 1000, 2) if p50 is not None else None,
+                    "p99": round(p99 * 1000, 2) if p99 is not None else None,
+                },
+            }
+        return {
+            "mode": "per symbol" if self.lane_count <= 0 else f"{self.lane_count} hashed lanes",
+            "pending": self.pending(),
+            "lanes": lanes,
+        }
@@ -0,0 +1,306 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from analytics import distribution
+
+ENDPOINTS = ("/api/status", "/api/trades", "/api/accounts/{id}/history")
+SYMBOLS = {"BTCUSDT": 60000.0, "ETHUSDT": 3000.0}
+
+
+# Poller processes: plain HTTP clients, kept off the server's event loop
+async def poll(session: aiohttp.ClientSession, url: str, until: float, interval: float, results: Dict):
+    """Request one URL until `until` (wall clock), waiting `interval` seconds between requests"""
+    while time.time() < until:
+        started = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                await response.read()
+                ok = response.status == 200
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        if ok:
+            results['latencies'].append(elapsed)
+        else:
+            results['errors'] += 1
+        if interval > 0:
+            await asyncio.sleep(max(0.0, interval - elapsed))
+
+
+async def run_pollers(urls: List[str], start_at: float, duration: float, interval: float) -> Dict:
+    results = {}
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        tasks = []
+        for url in urls:
+            endpoint_results = results.setdefault(url_endpoint(url), {"latencies": [], "errors": 0})
+            tasks.append(poll(session, url, start_at + duration, interval, endpoint_results))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def poller_ready(barrier):
+    """Warm-up job: returns once every poller process has started"""
+    barrier.wait()
+
+
+def poller_worker(urls: List[str], start_at: float, duration: float, interval: float) -> Dict:
+    """Entry point of a poller process"""
+    return asyncio.run(run_pollers(urls, start_at, duration, interval))
+
+
+def url_endpoint(url: str) -> str:
+    path = url.split("/", 3)[3]
+    return "/api/accounts/{id}/history" if path.endswith("/history") else "/" + path.split("?")[0]
+
+
+# Server process: the copier and the web app on one event loop, against the simulated exchange.
+# The copier is imported inside these functions so the poller processes stay light.
+def seed_trades(count: int, slave_ids: List[str]):
+    """Fill the trade log so /api/trades parses a realistically sized file"""
+    import copier
+    trades = []
+    for i in range(count):
+        symbol = list(SYMBOLS)[i % len(SYMBOLS)]
+        trades.append({
+            "timestamp": datetime.now().isoformat(), "master_id": "master_1",
+            "slave_id": slave_ids[i % len(slave_ids)], "symbol": symbol,
+            "side": "BUY" if i % 2 else "SELL", "quantity": 0.01, "price": SYMBOLS[symbol],
+            "status": "success", "error": None, "client_order_id": f"seed-{i}", "reduce_only": False,
+            "master_price": SYMBOLS[symbol],
+        })
+    with open(copier.TRADES_FILE, 'w') as f:
+        json.dump({"trades": trades}, f, indent=2)
+    copier.load_recent_trades()
+
+
+def master_fill(seq: int) -> Dict:
+    symbol = list(SYMBOLS)[seq % len(SYMBOLS)]
+    now = int(time.time() * 1000)
+    quantity = "0.01"
+    return {"e": "ORDER_TRADE_UPDATE", "E": now, "T": now, "o": {
+        "s": symbol, "c": f"load-{seq}", "S": "BUY" if (seq // len(SYMBOLS)) % 2 == 0 else "SELL",
+        "o": "MARKET", "q": quantity, "ap": str(SYMBOLS[symbol]), "L": str(SYMBOLS[symbol]),
+        "l": quantity, "z": quantity, "X": "FILLED", "x": "TRADE", "i": 900000 + seq, "t": 900000 + seq,
+        "ps": "BOTH", "R": False}}
+
+
+async def inject_fills(interval: float, until: float, phase_of, copy_latency: Dict[str, List[float]]):
+    """Feed master fills on a fixed schedule and time each copy until its slave orders are acked
+
+    Latency counts from when a fill was due, so fills delayed by a busy event
+    loop are measured too. Fills whose copy spans both phases are left out.
+    """
+    import copier
+    copies = []
+    seq = 0
+    due = time.perf_counter()
+    while time.time() < until:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        phase = phase_of(time.time())
+
+        def done(_, phase=phase, due=due):
+            if phase_of(time.time()) == phase:
+                copy_latency[phase].append(time.perf_counter() - due)
+
+        copied = copier.handle_master_message(master_fill(seq), "master_1")
+        if copied:
+            copied.add_done_callback(done)
+            copies.append(copied)
+        seq += 1
+        due += interval
+    await asyncio.gather(*copies)
+
+
+async def sample_loop_lag(until: float, phase_of, lag: Dict[str, List[float]], period: float = 0.01):
+    """How late the event loop wakes up a sleeper: the delay every stream and copy task sees"""
+    while time.time() < until:
+        started = time.perf_counter()
+        await asyncio.sleep(period)
+        lag[phase_of(time.time())].append(time.perf_counter() - started - period)
+
+
+def latency_report(samples: List[float]) -> Optional[Dict]:
+    return distribution([s * 1000 for s in samples])
+
+
+async def run_load_test(args) -> Dict:
+    import copier
+    import main
+    import uvicorn
+    import replay
+    from sim_exchange import SimulatedExchange
+    # Importing the copier configured logging
+    logging.getLogger().setLevel(args.log_level)
+
+    exchange = SimulatedExchange(latency=args.latency_ms / 1000.0, jitter=args.jitter_ms / 1000.0)
+    for symbol, price in SYMBOLS.items():
+        exchange.set_price(symbol, price)
+    if args.no_rate_delay:
+        for budget in copier.dispatch_scheduler.budgets.values():
+            budget.interval = 0
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        replay.setup_simulation(["master_1"], args.slaves, exchange, Path(tmp))
+        slave_ids = [f"sim_slave_{i}" for i in range(1, args.slaves + 1)]
+        seed_trades(args.trades, slave_ids)
+        copier.update_system_state(True)
+        copier.copying_active = True
+
+        # The web app is served from this event loop, like main.py does
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(
+            main.app, log_level="warning", log_config=None, lifespan="off", access_log=False
+        ))
+        server_task = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        base = f"http://127.0.0.1:{port}"
+        urls = []
+        for i in range(args.pollers):
+            endpoint = ENDPOINTS[i % len(ENDPOINTS)]
+            urls.append(base + endpoint.replace("{id}", slave_ids[i % len(slave_ids)]))
+
+        copy_latency = {"baseline": [], "under_load": []}
+        loop_lag = {"baseline": [], "under_load": []}
+
+        loop = asyncio.get_running_loop()
+        workers = max(1, min(args.workers, args.pollers))
+        poller_results = []
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager, ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            # Start every poller process before the baseline, so their startup does not load it.
+            # Each warm-up job waits for all the others, so each runs in its own process.
+            barrier = manager.Barrier(workers)
+            await asyncio.gather(*(loop.run_in_executor(pool, poller_ready, barrier) for _ in range(workers)))
+
+            start_at = time.time() + args.baseline
+            until = start_at + args.duration
+            phase_of = lambda now: "baseline" if now < start_at else "under_load"
+            jobs = [
+                loop.run_in_executor(pool, poller_worker, urls[w::workers], start_at, args.duration, args.interval)
+                for w in range(workers)
+            ]
+            await asyncio.gather(
+                inject_fills(args.fill_interval_ms / 1000.0, until, phase_of, copy_latency),
+                sample_loop_lag(until, phase_of, loop_lag),
+            )
+            poller_results = await asyncio.gather(*jobs)
+
+        server.should_exit = True
+        await server_task
+        copier.copying_active = False
+        for order_client in copier.order_clients.values():
+            await order_client.close_connection()
+
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        latencies = [s for r in poller_results for s in r.get(endpoint, {}).get("latencies", [])]
+        errors = sum(r.get(endpoint, {}).get("errors", 0) for r in poller_results)
+        endpoints[endpoint] = {
+            "pollers": sum(1 for url in urls if url_endpoint(url) == endpoint),
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / args.duration, 1),
+            "latency_ms": latency_report(latencies),
+        }
+
+    copy_baseline = latency_report(copy_latency["baseline"])
+    copy_loaded = latency_report(copy_latency["under_load"])
+    interference = None
+    if copy_baseline and copy_loaded:
+        interference = {
+            "copy_p50_ms": round(copy_loaded["p50"] - copy_baseline["p50"], 3),
+            "copy_p99_ms": round(copy_loaded["p99"] - copy_baseline["p99"], 3),
+            "copy_p99_ratio": round(copy_loaded["p99"] / copy_baseline["p99"], 2) if copy_baseline["p99"] else None,
+        }
+    return {
+        "pollers": args.pollers,
+        "poller_processes": workers,
+        "poll_interval_s": args.interval,
+        "duration_s": args.duration,
+        "endpoints": endpoints,
+        "copy_latency_ms": {"baseline": copy_baseline, "under_load": copy_loaded},
+        "fills_copied": {phase: len(samples) for phase, samples in copy_latency.items()},
+        "loop_lag_ms": {phase: latency_report(samples) for phase, samples in loop_lag.items()},
+        "interference": interference,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Load test the web API with concurrent pollers while measuring copy latency"
+    )
+    parser.add_argument("--pollers", type=int, default=300, help="Concurrent HTTP pollers (spread over the endpoints)")
+    parser.add_argument("--workers", type=int, default=4, help="Processes running the pollers")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Seconds between one poller's requests (0 = back to back)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--baseline", type=float, default=5.0,
+                        help="Seconds of copying without pollers first, once the poller processes started")
+    parser.add_argument("--slaves", type=int, default=3, help="Number of simulated slave accounts")
+    parser.add_argument("--trades", type=int, default=1000, help="Trades in the trade log served by /api/trades")
+    parser.add_argument("--fill-interval-ms", type=float, default=200.0, help="Time between master fills")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated exchange round-trip latency")
+    parser.add_argument("--jitter-ms", type=float, default=2.0, help="Simulated latency standard deviation")
+    parser.add_argument("--no-rate-delay", action="store_true", help="Disable the per-tier order rate budgets")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for the copier during the test")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+
+def format_latency(latency: Optional[Dict]) -> str:
+    if not latency:
+        return "-"
+    return f"p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}"
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run_load_test(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 50)
+    print("LOAD TEST REPORT")
+    print("=" * 50)
+    print(f"Pollers:         {report['pollers']} in {report['poller_processes']} process(es), "
+          f"every {report['poll_interval_s']} s for {report['duration_s']} s")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint}")
+        print(f"  {stats['requests']} requests, {stats['throughput_rps']} req/s, {stats['errors']} errors")
+        print(f"  latency ms: {format_latency(stats['latency_ms'])}")
+    print(f"Copy latency ms (fill to slave acks, {report['fills_copied']['baseline']} / "
+          f"{report['fills_copied']['under_load']} fills)")
+    print(f"  baseline:      {format_latency(report['copy_latency_ms']['baseline'])}")
+    print(f"  under load:    {format_latency(report['copy_latency_ms']['under_load'])}")
+    print("Event loop lag ms")
+    print(f"  baseline:      {format_latency(report['loop_lag_ms']['baseline'])}")
+    print(f"  under load:    {format_latency(report['loop_lag_ms']['under_load'])}")
+    if report['interference']:
+        interference = report['interference']
+        print(f"Interference:    copy p50 {interference['copy_p50_ms']:+} ms, p99 {interference['copy_p99_ms']:+} ms "
+              f"(x{interference['copy_p99_ratio']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from binance import AsyncClient
+from binance.exceptions import BinanceAPIException
+
+from clock import ServerClock, TIMESTAMP_ERROR
+from config import (
+    CLIENT_ORDER_ID_PREFIX, HEDGE_DEADLINE_DEFAULT, HEDGE_DEADLINE_MIN,
+    HEDGE_DEADLINE_MAX, HEDGE_DEADLINE_PERCENTILE, HEDGE_MIN_SAMPLES
+)
+
+logger = logging.getLogger(__name__)
+
+# Binance futures error code for a clientOrderId that was already used
+DUPLICATE_CLIENT_ORDER_ID = -4116
+# Binance futures error code for an order lookup that found nothing
+ORDER_NOT_FOUND = -2013
+# Error codes where the exchange itself does not know whether the order executed
+UNKNOWN_STATUS_CODES = {-1001, -1007}
+
+
+def make_client_order_id(master_order_id, fill_seq, slave_id: str) -> str:
+    """Deterministic client order id for one master fill copied to one slave
+
+    The same (master order, fill, slave) always maps to the same id, so an order
+    whose ack was lost can be looked up before it is sent again.
+    Binance allows at most 36 characters from [.A-Z:/a-z0-9_-].
+    """
+    key = f"{master_order_id}:{fill_seq}:{slave_id}"
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return (CLIENT_ORDER_ID_PREFIX + digest)[:36]
+
+
+class AckLatencyTracker:
+    """Rolling window of order ack latencies used to derive the hedge deadline"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+        return ordered[index]
+
+    def deadline(self) -> float:
+        """Seconds to wait for an ack before hedging"""
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEADLINE_DEFAULT
+        p = self.percentile(HEDGE_DEADLINE_PERCENTILE)
+        return min(HEDGE_DEADLINE_MAX, max(HEDGE_DEADLINE_MIN, p))
+
+
+def _is_duplicate(error: BaseException) -> bool:
+    return isinstance(error, BinanceAPIException) and error.code == DUPLICATE_CLIENT_ORDER_ID
+
+
+async def _lookup_order(client: AsyncClient, symbol: str, client_order_id: str) -> Tuple[Optional[Dict], bool]:
+    """Query an order by client order id
+
+    Returns (order, known): order is None if it does not exist, and known is
+    False if the query failed, so whether the order exists is unknown.
+    """
+    try:
+        return await client.futures_get_order(symbol=symbol, origClientOrderId=client_order_id), True
+    except BinanceAPIException as e:
+        if e.code == ORDER_NOT_FOUND:
+            return None, True
+        logger.warning("Could not look up order %s: %s", client_order_id, e)
+    except Exception as e:
+        logger.warning("Could not look up order %s: %s", client_order_id, e)
+    return None, False
+
+
+def _exchange_answer(error: Optional[BaseException]) -> bool:
+    """Whether a request failed with an answer from the exchange, so its outcome is known"""
+    return isinstance(error, BinanceAPIException) and error.code not in UNKNOWN_STATUS_CODES
+
+
+def _discard(task: asyncio.Task):
+    """Stop waiting for a request that can no longer fill"""
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
+
+
+async def submit_order(primary: AsyncClient, params: Dict, tracker: AckLatencyTracker,
+                       hedge: Optional[AsyncClient] = None, clock: Optional[ServerClock] = None) -> Dict:
+    """Place an idempotent order, resending it on a second connection if the ack is slow
+
+    params must contain newClientOrderId. The first request carries a recvWindow
+    of the tracker's deadline, so the exchange rejects it (-1021) if it arrives
+    later than that. If no ack arrives within the deadline, or the request
+    fails without an exchange answer, it waits until the request's
+    timestamp + recvWindow has passed on the exchange clock, and then looks the
+    order up by its id on the hedge connection. Only if it does not exist is
+    the identical order resent (on the hedge connection, or the primary one):
+    the first request can no longer fill, so the order never fills twice. If
+    the lookup fails, the first request alone is awaited.
+
+    Without a synced `clock` there is no telling when the first request expires,
+    so the order is sent once and never resent.
+    """
+    client_order_id = params['newClientOrderId']
+    start = time.perf_counter()
+    if clock is None or not clock.synced:
+        order = await primary.futures_create_order(**params)
+        tracker.record(time.perf_counter() - start)
+        return order
+
+    deadline = tracker.deadline()
+    recv_window = max(1, int(deadline * 1000))
+    primary_task = asyncio.create_task(primary.futures_create_order(**dict(params, recvWindow=recv_window)))
+    await asyncio.wait({primary_task}, timeout=deadline)
+    # The first request was signed by now, so the exchange rejects it from expires_at on
+    expires_at = clock.now_ms() + recv_window + clock.error_ms
+    if not primary_task.done():
+        logger.warning("No ack for %s after %.3fs, looking it up once it expired", client_order_id, deadline)
+        # A late ack is still taken while the first request expires
+        await asyncio.wait({primary_task}, timeout=max(0, expires_at - clock.now_ms()) / 1000)
+
+    error = None
+    if primary_task.done():
+        error = primary_task.exception()
+        if error is None:
+            tracker.record(time.perf_counter() - start)
+            return primary_task.result()
+        if _exchange_answer(error) and error.code != TIMESTAMP_ERROR:
+            # The exchange answered: the outcome is known, nothing to hedge
+            raise error
+
+    if _exchange_answer(error):
+        logger.warning("Order %s arrived after its recvWindow, sending hedge", client_order_id)
+    else:
+        if error is not None:
+            logger.warning("Order %s failed without exchange answer (%s), looking it up once it expired",
+                           client_order_id, error)
+        # A request without an answer may still be on its way until it expired
+        remaining = (expires_at - clock.now_ms()) / 1000
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+        order, known = await _lookup_order(hedge or primary, params['symbol'], client_order_id)
+        if order is not None:
+            # The first request landed; its ack is just slow
+            _discard(primary_task)
+            tracker.record(time.perf_counter() - start)
+            return order
+        if not known:
+            # Whether the first request filled is unknown: wait for its answer
+            order = await primary_task
+            tracker.record(time.perf_counter() - start)
+            return order
+        logger.warning("Order %s does not exist, sending hedge", client_order_id)
+    _discard(primary_task)
+
+    try:
+        order = await (hedge or primary).futures_create_order(**params)
+    except Exception as e:
+        if _exchange_answer(e) and not _is_duplicate(e):
+            raise
+        # A duplicate-id rejection, or a transport error, can still mean the
+        # resend reached the matching engine
+        order, _ = await _lookup_order(hedge or primary, params['symbol'], client_order_id)
+        if order is None:
+            raise
+    tracker.record(time.perf_counter() - start)
+    return order
@@ -0,0 +1,218 @@
+from typing import Dict, List, Optional, Tuple
+
+# Position key: (symbol, position side). One-way mode uses 'BOTH'; hedge mode
+# uses 'LONG' / 'SHORT'. Amounts are signed like Binance positionAmt
+# (SHORT positions are negative).
+PositionKey = Tuple[str, str]
+
+# Order states after which an order no longer changes
+FINAL_ORDER_STATES = {'FILLED', 'CANCELED', 'EXPIRED', 'REJECTED'}
+
+
+def signed_quantity(side: str, quantity: float) -> float:
+    """Position change caused by filling `quantity` on `side`"""
+    return quantity if side == 'BUY' else -quantity
+
+
+def direction_of(amount: float) -> Optional[str]:
+    """'LONG' or 'SHORT' for a signed amount, None when flat"""
+    if amount > 0:
+        return 'LONG'
+    if amount < 0:
+        return 'SHORT'
+    return None
+
+
+class PositionBook:
+    """In-memory positions per account, maintained from user-data stream events
+
+    ORDER_TRADE_UPDATE trades are applied as deltas, ACCOUNT_UPDATE positions
+    as absolute amounts. Both carry the transaction time `T`; a trade at or
+    before the last absolute update of the same position is already included
+    in it and is not applied again, whatever order the two events arrive in.
+
+    Orders the copier places itself are applied as soon as they are acked
+    (see expect_order), since their trades are streamed only later.
+    """
+
+    def __init__(self):
+        self.positions: Dict[str, Dict[PositionKey, float]] = {}
+        self._absolute_at: Dict[str, Dict[PositionKey, int]] = {}
+        self._loaded_at: Dict[str, int] = {}
+        self._own_orders: Dict[str, Dict[str, Dict]] = {}  # Orders of our own per account, by client order id
+
+    def is_known(self, account_id: str) -> bool:
+        """True once the account's positions were loaded"""
+        return account_id in self.positions
+
+    def get(self, account_id: str, symbol: str, position_side: str = 'BOTH') -> float:
+        return self.positions.get(account_id, {}).get((symbol, position_side), 0.0)
+
+    def net(self, account_id: str, symbol: str) -> float:
+        """Signed position in a symbol summed over position sides"""
+        return sum(amount for (sym, _), amount in self.positions.get(account_id, {}).items() if sym == symbol)
+
+    def symbols(self, account_id: str) -> List[str]:
+        """Symbols with an open position"""
+        return sorted({sym for (sym, _), amount in self.positions.get(account_id, {}).items() if amount})
+
+    def load_positions(self, account_id: str, positions: List[Dict], as_of: int = 0):
+        """Replace an account's positions with a REST snapshot (futures_account positions
+        or futures_position_information)
+
+        as_of is the exchange time (ms) the request was sent; trades before it are
+        already part of the snapshot and are not applied again.
+        """
+        book = {}
+        for pos in positions:
+            amount = float(pos.get('positionAmt', 0))
+            if amount:
+                book[(pos['symbol'], pos.get('positionSide', 'BOTH'))] = amount
+        self.positions[account_id] = book
+        self._absolute_at[account_id] = {}
+        self._loaded_at[account_id] = as_of
+        # Trades of orders placed before are now applied by their time like any other
+        self._own_orders.pop(account_id, None)
+
+    def expect_order(self, account_id: str, client_order_id: str, symbol: str, position_side: str, side: str):
+        """Track an order of our own before it is sent, so apply_order_ack can apply it early"""
+        if account_id not in self.positions:
+            return
+        self._own_orders.setdefault(account_id, {})[client_order_id] = {
+            "key": (symbol, position_side), "side": side,
+            "streamed": 0.0,  # Quantity streamed (and applied) before the ack
+            "done": False,  # Order reached a final state before the ack
+            "pending": None,  # Quantity applied at the ack whose trades are still to come
+            "absolute_at": None,  # Last absolute update of the position when the ack was applied
+        }
+
+    def apply_order_ack(self, account_id: str, client_order_id: str, quantity: float):
+        """Apply an accepted order right away instead of waiting for its trades
+
+        The order's trades are streamed only after the ack; until then the next
+        copy on the symbol would size from a stale position. Trades streamed
+        before the ack were already applied, so only the rest of `quantity` is
+        applied now, and the trades still to come are skipped.
+        """
+        own = self._own_orders.get(account_id, {}).get(client_order_id)
+        book = self.positions.get(account_id)
+        if own is None or book is None:
+            return
+        if own['done']:
+            del self._own_orders[account_id][client_order_id]
+            return
+        key = own['key']
+        pending = max(0.0, quantity - own['streamed'])
+        book[key] = round(book.get(key, 0.0) + signed_quantity(own['side'], pending), 10)
+        own['pending'] = pending
+        own['absolute_at'] = self._absolute_at.get(account_id, {}).get(key)
+
+    def discard_order(self, account_id: str, client_order_id: str):
+        """Stop tracking an order that was not acked; any trades of it apply normally"""
+        self._own_orders.get(account_id, {}).pop(client_order_id, None)
+
+    def _apply_acked_order_update(self, account_id: str, order: Dict, own: Dict) -> Optional[float]:
+        """Account for a streamed update of an order already applied at its ack"""
+        book = self.positions[account_id]
+        key = own['key']
+        if order.get('x') == 'TRADE':
+            own['pending'] -= float(order.get('l', 0))
+        if order.get('X') in FINAL_ORDER_STATES:
+            del self._own_orders[account_id][order['c']]
+            # Undo what the ack applied but never filled (or add an overfill)
+            book[key] = round(book.get(key, 0.0) - signed_quantity(own['side'], own['pending']), 10)
+        return book.get(key, 0.0) if order.get('x') == 'TRADE' else None
+
+    def apply_order_update(self, account_id: str, msg: Dict) -> Optional[float]:
+        """Apply a trade from ORDER_TRADE_UPDATE; returns the position after it
+
+        None if the message is not a trade or the account was never seeded.
+        """
+        order = msg['o']
+        book = self.positions.get(account_id)
+        own = self._own_orders.get(account_id, {}).get(order.get('c')) if book is not None else None
+        if own is not None and own['pending'] is not None:
+            if self._absolute_at.get(account_id, {}).get(own['key']) == own['absolute_at']:
+                return self._apply_acked_order_update(account_id, order, own)
+            # An absolute update replaced the position since the ack: it either
+            # includes this trade or predates it, which the trade time tells
+            del self._own_orders[account_id][order['c']]
+            own = None
+        if own is not None and order.get('X') in FINAL_ORDER_STATES:
+            own['done'] = True
+        if order.get('x') != 'TRADE':
+            return None
+        if book is None:
+            # Deltas are meaningless until the account was seeded
+            return None
+        key = (order['s'], order.get('ps', 'BOTH'))
+        trade_time = order.get('T', msg.get('T', 0))
+        if own is not None:
+            own['streamed'] += float(order.get('l', 0))
+
+        applied_until = max(self._absolute_at.get(account_id, {}).get(key, -1), self._loaded_at.get(account_id, -1))
+        if trade_time > applied_until:
+            amount = book.get(key, 0.0) + signed_quantity(order['S'], float(order.get('l', 0)))
+            # Drop float dust left by repeated partial fills
+            book[key] = round(amount, 10)
+        return book.get(key, 0.0)
+
+    def apply_account_update(self, account_id: str, msg: Dict):
+        """Apply the absolute positions of an ACCOUNT_UPDATE"""
+        update_time = msg.get('T', msg.get('E', 0))
+        book = self.positions.get(account_id)
+        if book is None:
+            return
+        absolute_at = self._absolute_at.setdefault(account_id, {})
+        for pos in msg.get('a', {}).get('P', []):
+            key = (pos['s'], pos.get('ps', 'BOTH'))
+            book[key] = float(pos['pa'])
+            absolute_at[key] = update_time
+
+    def apply_message(self, account_id: str, msg: Dict) -> Optional[float]:
+        """Apply any user-data message; returns the position after a trade"""
+        event = msg.get('e')
+        if event == 'ORDER_TRADE_UPDATE':
+            return self.apply_order_update(account_id, msg)
+        if event == 'ACCOUNT_UPDATE':
+            self.apply_account_update(account_id, msg)
+        return None
+
+    def forget(self, account_id: str):
+        self.positions.pop(account_id, None)
+        self._absolute_at.pop(account_id, None)
+        self._loaded_at.pop(account_id, None)
+        self._own_orders.pop(account_id, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Open positions as {account: {"SYMBOL:SIDE": amount}}"""
+        return {
+            account_id: {f"{symbol}:{side}": amount for (symbol, side), amount in book.items() if amount}
+            for account_id, book in self.positions.items()
+        }
+
+
+def plan_copy(before: float, after: float) -> Tuple[float, Optional[str], float, Optional[str]]:
+    """Split a master position change into a close part and an open part
+
+    Returns (close_fraction, close_direction, open_quantity, open_direction):
+    the fraction of the previous position that was closed and its direction,
+    and the master quantity that opened new exposure and its direction. A
+    reversal (long to short or back) has both parts.
+    """
+    close_fraction, close_direction = 0.0, None
+    open_quantity, open_direction = 0.0, None
+    prev_dir, new_dir = direction_of(before), direction_of(after)
+
+    if prev_dir and prev_dir != new_dir:
+        # Fully closed, or reversed
+        close_fraction, close_direction = 1.0, prev_dir
+    elif prev_dir and abs(after) < abs(before):
+        close_fraction, close_direction = (abs(before) - abs(after)) / abs(before), prev_dir
+
+    if new_dir and new_dir != prev_dir:
+        open_quantity, open_direction = abs(after), new_dir
+    elif new_dir and abs(after) > abs(before):
+        open_quantity, open_direction = abs(after) - abs(before), new_dir
+
+    return close_fraction, close_direction, open_quantity, open_direction
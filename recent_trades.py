@@ -0,0 +1,146 @@
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
+
+from config import RECENT_TRADES_SIZE
+
+# Fields of a trade record (main.TradeRecord), in that order
+TRADE_FIELDS = (
+    "timestamp", "master_id", "slave_id", "symbol", "side", "quantity", "price", "status", "error",
+    "client_order_id", "reduce_only", "master_price", "master_event_time", "master_trade_time",
+    "dispatched_at", "acked_at", "filled_at",
+)
+TRADE_DEFAULTS = {"reduce_only": False}
+_trade_values = attrgetter(*TRADE_FIELDS)
+
+
+class TradeEntry:
+    """One trade record, without the per-record dict of a plain object"""
+
+    __slots__ = TRADE_FIELDS
+
+    def __init__(self, trade: Dict):
+        for field in TRADE_FIELDS:
+            setattr(self, field, trade.get(field, TRADE_DEFAULTS.get(field)))
+
+    def as_dict(self) -> Dict:
+        return dict(zip(TRADE_FIELDS, _trade_values(self)))
+
+
+class TradeTotals:
+    """Running counts and volume of a group of trades"""
+
+    __slots__ = ("trades", "success", "failed", "pending", "unconfirmed", "quantity", "notional")
+
+    def __init__(self):
+        self.trades = self.success = self.failed = self.pending = self.unconfirmed = 0
+        self.quantity = self.notional = 0.0
+
+    def add(self, entry: TradeEntry, sign: int = 1):
+        self.trades += sign
+        if entry.status == 'success':
+            self.success += sign
+            quantity = entry.quantity or 0.0
+            self.quantity += sign * quantity
+            self.notional += sign * quantity * (entry.price or 0.0)
+        elif entry.status == 'pending':
+            self.pending += sign
+        elif entry.status == 'unconfirmed':
+            self.unconfirmed += sign
+        else:
+            self.failed += sign
+
+    def snapshot(self) -> Dict:
+        completed = self.success + self.failed
+        return {
+            "trades": self.trades,
+            "success": self.success,
+            "failed": self.failed,
+            "pending": self.pending,
+            "unconfirmed": self.unconfirmed,
+            "success_rate": round(self.success / completed, 4) if completed else None,
+            "quantity": round(self.quantity, 8),
+            "notional": round(self.notional, 2),
+        }
+
+
+class RecentTrades:
+    """Fixed-size ring of the most recent trade records, with running totals per slave and symbol
+
+    Appends and updates are O(1) and memory is capped at `capacity` records, so
+    the dashboard is served without reading the trade log. The totals cover
+    every trade seen since the log was loaded, including ones that have since
+    left the ring; a trade completed after leaving the ring keeps its
+    earlier status in them.
+    """
+
+    def __init__(self, capacity: int = RECENT_TRADES_SIZE):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self.entries: List[Optional[TradeEntry]] = [None] * self.capacity
+        self.next = 0  # Slot of the next append
+        self.size = 0
+        self.by_order_id: Dict[str, TradeEntry] = {}
+        self.totals = TradeTotals()
+        self.slave_totals: Dict[str, TradeTotals] = {}
+        self.symbol_totals: Dict[Tuple[str, str], TradeTotals] = {}
+
+    def load(self, trades: List[Dict]):
+        """Replace the contents with a trade log (oldest first)"""
+        self.clear()
+        for trade in trades:
+            self.append(trade)
+
+    def _count(self, entry: TradeEntry, sign: int = 1):
+        self.totals.add(entry, sign)
+        slave = self.slave_totals.get(entry.slave_id)
+        if slave is None:
+            slave = self.slave_totals[entry.slave_id] = TradeTotals()
+        slave.add(entry, sign)
+        key = (entry.slave_id, entry.symbol)
+        symbol = self.symbol_totals.get(key)
+        if symbol is None:
+            symbol = self.symbol_totals[key] = TradeTotals()
+        symbol.add(entry, sign)
+
+    def append(self, trade: Dict):
+        entry = TradeEntry(trade)
+        evicted = self.entries[self.next]
+        if evicted is not None and self.by_order_id.get(evicted.client_order_id) is evicted:
+            del self.by_order_id[evicted.client_order_id]
+        self.entries[self.next] = entry
+        self.next = (self.next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        if entry.client_order_id:
+            self.by_order_id[entry.client_order_id] = entry
+        self._count(entry)
+
+    def update(self, client_order_id: str, updates: Dict) -> bool:
+        """Apply the outcome of an order to its record; False if it is no longer in the ring"""
+        entry = self.by_order_id.get(client_order_id)
+        if entry is None:
+            return False
+        self._count(entry, -1)
+        for field, value in updates.items():
+            if field in TRADE_FIELDS:
+                setattr(entry, field, value)
+        self._count(entry)
+        return True
+
+    def latest(self, limit: int) -> List[Dict]:
+        """The most recent `limit` records, oldest first like the trade log"""
+        count = max(0, min(limit, self.size))
+        start = self.next - count
+        return [self.entries[i % self.capacity].as_dict() for i in range(start, self.next)]
+
+    def summary(self) -> Dict:
+        """Running totals overall, per slave and per slave and symbol"""
+        slaves = {
+            slave_id: {**totals.snapshot(), "symbols": {}}
+            for slave_id, totals in sorted(self.slave_totals.items()) if totals.trades
+        }
+        for (slave_id, symbol), totals in sorted(self.symbol_totals.items()):
+            if totals.trades:
+                slaves[slave_id]["symbols"][symbol] = totals.snapshot()
+        return {"overall": self.totals.snapshot(), "recent": self.size, "capacity": self.capacity, "slaves": slaves}
@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import DRIFT_THRESHOLD
+from position_book import PositionBook, direction_of, plan_copy
+
+
+class DriftReconciler:
+    """Expected slave positions and the drift of the actual ones
+
+    For every (slave, master, symbol) the copier learns the ratio between the
+    slave position it intended and the master position, from the orders it
+    plans. The expected slave position is the sum over masters of master
+    position × ratio; comparing it with the slave's tracked position shows
+    copies that failed or were lost.
+    """
+
+    def __init__(self):
+        self.ratios: Dict[str, Dict[str, Dict[str, float]]] = {}  # slave -> master -> symbol -> ratio
+        self.drift: Dict[str, Dict[str, Dict]] = {}  # slave -> symbol -> last measured drift
+        self._suspect: Dict[Tuple[str, str], int] = {}  # Drift seen on the previous check, by sign
+        self.checks = 0
+        self.corrections = 0
+        self.position_refreshes = 0
+        self.last_check: Optional[str] = None
+
+    def record_copy(self, master_id: str, slave_id: str, symbol: str,
+                    master_position: Tuple[float, float], slave_open_quantity: float):
+        """Update the slave's ratio after the copy of a master position change was planned"""
+        before, after = master_position
+        ratios = self.ratios.setdefault(slave_id, {}).setdefault(master_id, {})
+        if not after:
+            return
+        close_fraction, _, _, _ = plan_copy(before, after)
+        kept = 0.0
+        if direction_of(before) == direction_of(after):
+            if symbol not in ratios:
+                # Position existed before anything was copied: ratio stays unknown
+                return
+            kept = abs(before) * ratios[symbol] * (1 - close_fraction)
+        ratios[symbol] = (kept + slave_open_quantity) / abs(after)
+
+    def expected_position(self, book: PositionBook, slave_id: str, symbol: str) -> Optional[float]:
+        """Slave position implied by its masters' positions; None if unknown"""
+        expected, known = 0.0, False
+        for master_id, ratios in self.ratios.get(slave_id, {}).items():
+            if symbol in ratios and book.is_known(master_id):
+                expected += book.net(master_id, symbol) * ratios[symbol]
+                known = True
+        return expected if known else None
+
+    def masters_of(self, slave_id: str) -> List[str]:
+        return list(self.ratios.get(slave_id, {}))
+
+    def find_drift(self, book: PositionBook, slave_id: str) -> List[Dict]:
+        """Measure a slave's drift; returns the drifts confirmed on two consecutive checks"""
+        symbols = set(book.symbols(slave_id))
+        for ratios in self.ratios.get(slave_id, {}).values():
+            symbols.update(ratios)
+
+        measured, confirmed = {}, []
+        for symbol in sorted(symbols):
+            expected = self.expected_position(book, slave_id, symbol)
+            if expected is None:
+                continue
+            actual = book.net(slave_id, symbol)
+            drift = round(expected - actual, 10)
+            scale = max(abs(expected), abs(actual))
+            drift_pct = abs(drift) / scale if scale else 0.0
+            measured[symbol] = {
+                "expected": round(expected, 10), "actual": actual, "drift": drift,
+                "drift_pct": round(drift_pct * 100, 2)
+            }
+
+            key = (slave_id, symbol)
+            sign = 1 if drift > 0 else -1
+            if drift_pct > DRIFT_THRESHOLD:
+                # A copy may still be on its way: only act if the drift persists
+                if self._suspect.get(key) == sign:
+                    confirmed.append({"symbol": symbol, **measured[symbol]})
+                self._suspect[key] = sign
+            else:
+                self._suspect.pop(key, None)
+
+        self.drift[slave_id] = measured
+        return confirmed
+
+    def clear_suspect(self, slave_id: str, symbol: str):
+        self._suspect.pop((slave_id, symbol), None)
+
+    def finish_check(self):
+        self.checks += 1
+        self.last_check = datetime.now().isoformat()
+
+    def forget(self, account_id: str):
+        """Drop an account as slave and as master"""
+        self.ratios.pop(account_id, None)
+        self.drift.pop(account_id, None)
+        for ratios in self.ratios.values():
+            ratios.pop(account_id, None)
+        self._suspect = {key: sign for key, sign in self._suspect.items() if key[0] != account_id}
+
+    def metrics(self) -> Dict:
+        """Drift report for the API"""
+        drifting = {
+            slave_id: {symbol: d for symbol, d in symbols.items() if d["drift_pct"] > DRIFT_THRESHOLD * 100}
+            for slave_id, symbols in self.drift.items()
+        }
+        return {
+            "checks": self.checks,
+            "last_check": self.last_check,
+            "corrections": self.corrections,
+            "position_refreshes": self.position_refreshes,
+            "threshold_pct": DRIFT_THRESHOLD * 100,
+            "drifting": {slave_id: symbols for slave_id, symbols in drifting.items() if symbols},
+            "positions": self.drift,
+        }
+
+    def restore(self, ratios: Dict):
+        self.ratios = {slave: {master: dict(r) for master, r in masters.items()} for slave, masters in ratios.items()}
@@ -0,0 +1,57 @@
+import gzip
+import heapq
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import RECORDINGS_DIR
+
+# One recorded message: (receive time in ns since epoch, master id, raw message)
+RecordedMessage = Tuple[int, str, Dict]
+
+
+class StreamRecorder:
+    """Append raw user-data stream messages to a gzip-compressed JSON-lines log"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, 'at', encoding='utf-8')
+        self.count = 0
+
+    @classmethod
+    def for_master(cls, master_id: str) -> "StreamRecorder":
+        """Open a new recording file for a master stream session"""
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        return cls(RECORDINGS_DIR / f"{master_id}-{stamp}.jsonl.gz")
+
+    def record(self, master_id: str, msg: Dict, received_ns: Optional[int] = None):
+        """Write one message with its receive timestamp"""
+        if received_ns is None:
+            received_ns = time.time_ns()
+        self._file.write(json.dumps([received_ns, master_id, msg], separators=(',', ':')))
+        self._file.write('\n')
+        self.count += 1
+
+    def close(self):
+        """Flush and close the recording"""
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_recording(path: Path) -> Iterator[RecordedMessage]:
+    """Iterate over the messages of a single recording file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            received_ns, master_id, msg = json.loads(line)
+            yield received_ns, master_id, msg
+
+
+def load_recordings(paths: List[Path]) -> Iterator[RecordedMessage]:
+    """Merge several recording files into one stream ordered by receive time"""
+    return heapq.merge(*(read_recording(p) for p in paths), key=lambda m: m[0])
@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import copier
+from recorder import load_recordings
+from sim_exchange import SimulatedExchange, SimulatedWsApi, price_from_message
+from ws_orders import WsOrderClient
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def setup_simulation(master_ids: List[str], slave_count: int, exchange: SimulatedExchange, data_dir: Path):
+    """Point the copier at a scratch data dir and simulated accounts"""
+    copier.ACCOUNTS_FILE = data_dir / "accounts.json"
+    copier.TRADES_FILE = data_dir / "trades.json"
+    copier.SYSTEM_FILE = data_dir / "system.json"
+
+    accounts = []
+    for master_id in master_ids:
+        accounts.append({"id": master_id, "type": "master", "api_key": "sim", "api_secret": "sim",
+                         "multiplier": 1.0, "active": True})
+    for i in range(1, slave_count + 1):
+        accounts.append({"id": f"sim_slave_{i}", "type": "slave", "api_key": "sim", "api_secret": "sim",
+                         "multiplier": 1.0, "active": True})
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    copier.save_accounts(accounts)
+    with open(copier.TRADES_FILE, 'w') as f:
+        json.dump({"trades": []}, f)
+    copier.load_recent_trades()
+
+    for account in accounts:
+        copier.active_connections[account['id']] = exchange.client(account['id'])
+        # Accounts start flat; slave fills come back through their simulated streams
+        copier.position_book.load_positions(account['id'], [])
+        if account['type'] == 'slave':
+            exchange.listeners[account['id']] = (
+                lambda msg, slave_id=account['id']: copier.handle_slave_message(msg, slave_id)
+            )
+            copier.streaming_slaves.add(account['id'])
+            if copier.HEDGED_ORDERS:
+                copier.hedge_connections[account['id']] = exchange.client(account['id'])
+
+
+async def start_ws_api(exchange: SimulatedExchange) -> SimulatedWsApi:
+    """Serve the simulated exchange over a local WebSocket API and route slave orders through it"""
+    slave_ids = [acc['id'] for acc in copier.registered_accounts() if acc['type'] == 'slave']
+    server = SimulatedWsApi(exchange, {f"sim-{slave_id}": (slave_id, "sim") for slave_id in slave_ids})
+    url = await server.start()
+    for slave_id in slave_ids:
+        order_client = WsOrderClient(copier.active_connections[slave_id], f"sim-{slave_id}", "sim", url=url)
+        await order_client.connect()
+        copier.order_clients[slave_id] = order_client
+    return server
+
+
+async def replay_master(messages: List[Dict], start: float, speed: float, latencies: List[float]):
+    """Feed one master's messages through the copy pipeline in order, like monitor_master"""
+    first_ns = messages[0]['received_ns']
+    copies = []
+    for item in messages:
+        if speed > 0:
+            due = start + (item['received_ns'] - first_ns) / 1e9 / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            due = time.perf_counter()
+
+        copied = copier.handle_master_message(item['msg'], item['master_id'])
+
+        if copied and item['is_fill']:
+            copied.add_done_callback(lambda _, due=due: latencies.append(time.perf_counter() - due))
+            copies.append(copied)
+        # Let the lanes run between messages, as a live stream would
+        await asyncio.sleep(0)
+    await asyncio.gather(*copies)
+
+
+async def run_replay(args) -> Dict:
+    """Replay recordings against a simulated exchange and collect metrics"""
+    exchange = SimulatedExchange(
+        latency=args.latency_ms / 1000.0, jitter=args.jitter_ms / 1000.0,
+        tail_rate=args.tail_rate, tail_latency=args.tail_ms / 1000.0
+    )
+
+    per_master: Dict[str, List[Dict]] = {}
+    total = 0
+    for received_ns, master_id, msg in load_recordings([Path(p) for p in args.recordings]):
+        order = msg.get('o', {}) if isinstance(msg, dict) else {}
+        is_fill = msg.get('e') == 'ORDER_TRADE_UPDATE' and order.get('X') == 'FILLED'
+        per_master.setdefault(master_id, []).append(
+            {"received_ns": received_ns, "master_id": master_id, "msg": msg, "is_fill": is_fill}
+        )
+        price = price_from_message(msg)
+        if price and order.get('s') not in exchange.prices:
+            exchange.set_price(order['s'], price)
+        total += 1
+
+    if not total:
+        raise SystemExit("No messages found in recordings")
+
+    if args.no_rate_delay:
+        for budget in copier.dispatch_scheduler.budgets.values():
+            budget.interval = 0
+
+    with tempfile.TemporaryDirectory(prefix="replay-") as tmp:
+        setup_simulation(list(per_master), args.slaves, exchange, Path(tmp))
+
+        ws_server = await start_ws_api(exchange) if args.ws_api else None
+
+        latencies: List[float] = []
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            replay_master(messages, start, args.speed, latencies) for messages in per_master.values()
+        ))
+        elapsed = time.perf_counter() - start
+
+        if ws_server:
+            for order_client in copier.order_clients.values():
+                await order_client.close_connection()
+            await ws_server.stop()
+
+    fills = len(latencies)
+    return {
+        "messages": total,
+        "fills": fills,
+        "orders_placed": len(exchange.orders),
+        "exchange_requests": exchange.request_count,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_msgs_per_s": round(total / elapsed, 1) if elapsed else 0.0,
+        "throughput_fills_per_s": round(fills / elapsed, 1) if elapsed else 0.0,
+        "lanes": len(copier.dispatch_lanes.lanes),
+        "max_lane_depth": max((lane.max_depth for lane in copier.dispatch_lanes.lanes.values()), default=0),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p90": round(percentile(latencies, 90) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay recorded master streams through the copy pipeline")
+    parser.add_argument("recordings", nargs="+", help="Recording files (*.jsonl.gz) to replay")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed factor (1 = real time, N = N times faster, 0 = as fast as possible)")
+    parser.add_argument("--slaves", type=int, default=5, help="Number of simulated slave accounts")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated exchange round-trip latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Simulated latency standard deviation")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of requests hit by tail latency")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="Simulated tail latency")
+    parser.add_argument("--ws-api", action="store_true",
+                        help="Place slave orders over a local WebSocket API instead of REST")
+    parser.add_argument("--no-rate-delay", action="store_true", help="Disable the per-tier order rate budgets")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for the copier during replay")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.getLogger().setLevel(args.log_level)
+
+    report = asyncio.run(run_replay(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 50)
+    print("REPLAY REPORT")
+    print("=" * 50)
+    print(f"Messages:        {report['messages']}")
+    print(f"Fills copied:    {report['fills']}")
+    print(f"Orders placed:   {report['orders_placed']}")
+    print(f"REST requests:   {report['exchange_requests']}")
+    print(f"Elapsed:         {report['elapsed_s']} s")
+    print(f"Throughput:      {report['throughput_msgs_per_s']} msg/s, {report['throughput_fills_per_s']} fills/s")
+    print(f"Dispatch lanes:  {report['lanes']} (max depth {report['max_lane_depth']})")
+    latency = report['latency_ms']
+    print(f"Fill latency ms: mean {latency['mean']}  p50 {latency['p50']}  p90 {latency['p90']}  "
+          f"p99 {latency['p99']}  max {latency['max']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import DISPATCH_TIERS, DEFAULT_TIER
+from orders import AckLatencyTracker
+
+
+class TokenBucket:
+    """Order budget: one token per `interval` seconds, up to `burst` saved up"""
+
+    def __init__(self, interval: float, burst: int = 1):
+        self.interval = interval
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waited = 0.0  # Total seconds spent waiting for tokens
+
+    async def acquire(self):
+        while self.interval > 0:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) * self.interval
+            self.waited += wait
+            await asyncio.sleep(wait)
+
+
+class DispatchScheduler:
+    """Orders slaves by priority tier and observed latency, with a rate budget per tier
+
+    Tiers are dispatched in DISPATCH_TIERS order. Within a tier, slaves with the
+    fastest recent acks go first, so the quick orders are not queued behind
+    slow ones. Each tier draws from its own token bucket, so lower tiers
+    cannot use up the request budget of higher ones.
+    """
+
+    def __init__(self, tiers: Dict[str, Dict] = DISPATCH_TIERS):
+        self.ranks = {name: rank for rank, name in enumerate(tiers)}
+        self.budgets = {name: TokenBucket(tier['interval'], tier.get('burst', 1)) for name, tier in tiers.items()}
+        self.latency = {name: AckLatencyTracker(window=500) for name in tiers}
+        self.orders = {name: 0 for name in tiers}
+
+    def tier_of(self, account: Dict) -> str:
+        tier = account.get('tier', DEFAULT_TIER)
+        return tier if tier in self.ranks else DEFAULT_TIER
+
+    def order(self, slaves: List[Dict], ack_latency_of: Callable[[str], Optional[float]]) -> List[Dict]:
+        """Slaves in dispatch order"""
+        def key(slave):
+            latency = ack_latency_of(slave['id'])
+            return self.ranks[self.tier_of(slave)], latency if latency is not None else math.inf
+        return sorted(slaves, key=key)
+
+    async def acquire(self, tier: str):
+        """Wait for the tier's rate budget before sending an order"""
+        await self.budgets[tier].acquire()
+        self.orders[tier] += 1
+
+    def record(self, tier: str, seconds: float):
+        """Record the time from a master fill to a slave's ack"""
+        self.latency[tier].record(seconds)
+
+    def snapshot(self) -> Dict:
+        """Per-tier dispatch metrics for the API"""
+        tiers = {}
+        for name in self.ranks:
+            tracker = self.latency[name]
+            tiers[name] = {
+                "rank": self.ranks[name],
+                "orders": self.orders[name],
+                "throttled_s": round(self.budgets[name].waited, 3),
+                "latency_ms": {
+                    f"p{pct}": round(tracker.percentile(pct) * 1000, 2) if tracker.samples else None
+                    for pct in (50, 90, 99)
+                },
+            }
+        return tiers
@@ -0,0 +1,294 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import websockets
+from binance.exceptions import BinanceAPIException
+
+from ws_orders import sign_params
+
+
+class SimulatedExchange:
+    """In-process stand-in for the Binance futures REST API used for replay and profiling"""
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.005, default_price: float = 100.0,
+                 tail_rate: float = 0.0, tail_latency: float = 0.0, stream_delay: float = 0.0):
+        self.latency = latency  # Mean simulated round-trip in seconds
+        self.jitter = jitter
+        self.tail_rate = tail_rate  # Fraction of requests that take tail_latency instead
+        self.tail_latency = tail_latency
+        self.stream_delay = stream_delay  # Seconds a fill's stream event lags the order response
+        self.default_price = default_price
+        self.prices: Dict[str, float] = {}
+        self.balances: Dict[str, float] = {}
+        self.hedge_mode: Dict[str, bool] = {}
+        self.positions: Dict[str, Dict[str, float]] = {}
+        self.orders: List[Dict] = []
+        self.orders_by_client_id: Dict[str, Dict] = {}
+        self.listeners: Dict[str, Callable[[Dict], None]] = {}  # Per-account user-data stream callbacks
+        self.request_count = 0
+        self._order_ids = itertools.count(1)
+
+    def add_account(self, account_id: str, balance: float = 10000.0, hedge_mode: bool = False):
+        """Register a simulated futures account"""
+        self.balances[account_id] = balance
+        self.hedge_mode[account_id] = hedge_mode
+        self.positions.setdefault(account_id, {})
+
+    def set_price(self, symbol: str, price: float):
+        """Set the last traded price of a symbol"""
+        if price > 0:
+            self.prices[symbol] = price
+
+    def client(self, account_id: str) -> "SimulatedClient":
+        """Create a client bound to one simulated account"""
+        if account_id not in self.balances:
+            self.add_account(account_id)
+        return SimulatedClient(self, account_id)
+
+    def api_error(self, code: int, msg: str, status_code: int = 400) -> BinanceAPIException:
+        """Build an exception shaped like a Binance REST error response"""
+        return BinanceAPIException(None, status_code, json.dumps({"code": code, "msg": msg}))
+
+    def publish_fill(self, account_id: str, order: Dict):
+        """Deliver the ORDER_TRADE_UPDATE of a fill to the account's stream listener"""
+        listener = self.listeners.get(account_id)
+        if not listener:
+            return
+        now = int(time.time() * 1000)
+        msg = {"e": "ORDER_TRADE_UPDATE", "E": now, "T": now, "o": {
+            "s": order["symbol"], "c": order["clientOrderId"], "S": order["side"], "o": order["type"],
+            "q": order["origQty"], "ap": order["avgPrice"], "x": "TRADE", "X": "FILLED",
+            "i": order["orderId"], "l": order["executedQty"], "z": order["executedQty"],
+            "L": order["avgPrice"], "T": now, "t": order["orderId"], "ps": order["positionSide"],
+        }}
+        # Like a real stream the event arrives after the REST response
+        loop = asyncio.get_running_loop()
+        if self.stream_delay:
+            loop.call_later(self.stream_delay, listener, msg)
+        else:
+            loop.call_soon(listener, msg)
+
+    async def _round_trip(self):
+        self.request_count += 1
+        delay = self.latency
+        if self.tail_rate and random.random() < self.tail_rate:
+            delay = self.tail_latency
+        elif self.jitter:
+            delay = max(0.0, random.gauss(self.latency, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class SimulatedClient:
+    """Implements the subset of AsyncClient methods the copier calls"""
+
+    def __init__(self, exchange: SimulatedExchange, account_id: str):
+        self.exchange = exchange
+        self.account_id = account_id
+        self.timestamp_offset = 0
+
+    async def futures_ping(self) -> Dict:
+        await self.exchange._round_trip()
+        return {}
+
+    async def futures_time(self) -> Dict:
+        await self.exchange._round_trip()
+        return {"serverTime": int(time.time() * 1000)}
+
+    async def futures_account(self, **params) -> Dict:
+        await self.exchange._round_trip()
+        balance = self.exchange.balances[self.account_id]
+        positions = [
+            {"symbol": symbol, "positionAmt": str(amount), "entryPrice": "0",
+             "markPrice": str(self.exchange.prices.get(symbol, self.exchange.default_price)),
+             "unrealizedProfit": "0", "positionSide": "BOTH"}
+            for symbol, amount in self.exchange.positions[self.account_id].items()
+        ]
+        return {
+            "totalWalletBalance": str(balance),
+            "availableBalance": str(balance),
+            "totalMarginBalance": str(balance),
+            "totalUnrealizedProfit": "0",
+            "assets": [{"asset": "USDT", "walletBalance": str(balance), "unrealizedProfit": "0"}],
+            "positions": positions,
+        }
+
+    async def futures_position_information(self, **params) -> List[Dict]:
+        await self.exchange._round_trip()
+        return [
+            {"symbol": symbol, "positionAmt": str(amount), "entryPrice": "0", "positionSide": "BOTH",
+             "markPrice": str(self.exchange.prices.get(symbol, self.exchange.default_price))}
+            for symbol, amount in self.exchange.positions[self.account_id].items()
+        ]
+
+    async def futures_symbol_ticker(self, symbol: str, **params) -> Dict:
+        await self.exchange._round_trip()
+        return {"symbol": symbol, "price": str(self.exchange.prices.get(symbol, self.exchange.default_price))}
+
+    async def futures_get_position_mode(self, **params) -> Dict:
+        await self.exchange._round_trip()
+        return {"dualSidePosition": self.exchange.hedge_mode[self.account_id]}
+
+    async def futures_create_order(self, **params) -> Dict:
+        # A request that was sent is executed even if the caller stops waiting for it
+        timestamp = int(time.time() * 1000 + self.timestamp_offset)
+        return await asyncio.shield(self._create_order(params, timestamp))
+
+    async def _create_order(self, params: Dict, timestamp: int) -> Dict:
+        await self.exchange._round_trip()
+        recv_window = params.get('recvWindow')
+        if recv_window is not None and time.time() * 1000 - timestamp > recv_window:
+            raise self.exchange.api_error(-1021, "Timestamp for this request is outside of the recvWindow.")
+        client_order_id = params.get('newClientOrderId')
+        existing = self.exchange.orders_by_client_id.get(client_order_id) if client_order_id else None
+        if existing and existing['status'] == 'NEW':
+            # Like Binance, client order ids are only unique among open orders
+            raise self.exchange.api_error(-4116, "ClientOrderId is duplicated.")
+        symbol = params['symbol']
+        quantity = float(params['quantity'])
+        if quantity <= 0:
+            raise self.exchange.api_error(-4003, "Quantity less than or equal to zero.")
+        price = self.exchange.prices.get(symbol, self.exchange.default_price)
+        signed = quantity if params['side'] == 'BUY' else -quantity
+        positions = self.exchange.positions[self.account_id]
+        positions[symbol] = positions.get(symbol, 0.0) + signed
+        order = {
+            "orderId": next(self.exchange._order_ids),
+            "clientOrderId": params.get('newClientOrderId', ''),
+            "symbol": symbol,
+            "side": params['side'],
+            "type": params.get('type', 'MARKET'),
+            "positionSide": params.get('positionSide', 'BOTH'),
+            "status": "FILLED",
+            "origQty": str(quantity),
+            "executedQty": str(quantity),
+            "avgPrice": str(price),
+            "updateTime": int(time.time() * 1000),
+            "account_id": self.account_id,
+        }
+        self.exchange.orders.append(order)
+        if client_order_id:
+            self.exchange.orders_by_client_id[client_order_id] = order
+        self.exchange.publish_fill(self.account_id, order)
+        if params.get('newOrderRespType') == 'ACK':
+            return {**order, "status": "NEW", "executedQty": "0", "avgPrice": "0.00"}
+        return order
+
+    async def futures_get_order(self, **params) -> Dict:
+        await self.exchange._round_trip()
+        order = self.exchange.orders_by_client_id.get(params.get('origClientOrderId'))
+        if not order or order['account_id'] != self.account_id:
+            raise self.exchange.api_error(-2013, "Order does not exist.")
+        return order
+
+    async def futures_account_trades(self, **params) -> List[Dict]:
+        await self.exchange._round_trip()
+        return [
+            {"time": o["updateTime"], "symbol": o["symbol"], "side": o["side"], "price": o["avgPrice"],
+             "qty": o["executedQty"], "commission": "0", "realizedPnl": "0"}
+            for o in self.exchange.orders if o["account_id"] == self.account_id
+        ][-params.get('limit', 500):]
+
+    async def get_deposit_history(self, **params) -> List[Dict]:
+        await self.exchange._round_trip()
+        return []
+
+    async def futures_income_history(self, **params) -> List[Dict]:
+        await self.exchange._round_trip()
+        return []
+
+    async def futures_exchange_info(self, **params) -> Dict:
+        await self.exchange._round_trip()
+        return {"symbols": [
+            {"symbol": symbol, "filters": [
+                {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001"},
+                {"filterType": "MIN_NOTIONAL", "notional": "5"},
+            ]}
+            for symbol in self.exchange.prices
+        ]}
+
+    async def close_connection(self):
+        pass
+
+
+class SimulatedWsApi:
+    """Local stand-in for the futures WebSocket API, placing orders on a SimulatedExchange"""
+
+    def __init__(self, exchange: SimulatedExchange, credentials: Dict[str, Tuple[str, str]]):
+        self.exchange = exchange
+        self.credentials = credentials  # api_key -> (account_id, api_secret)
+        self.requests = 0
+        self._server = None
+        self._connections = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening; returns the ws:// url"""
+        self._server = await websockets.serve(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://{host}:{port}"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def drop_connections(self):
+        """Close every client socket, like a network failure"""
+        for ws in list(self._connections):
+            await ws.close()
+
+    async def _handle(self, ws, path=None):
+        self._connections.add(ws)
+        try:
+            async for raw in ws:
+                request = json.loads(raw)
+                asyncio.create_task(self._answer(ws, request))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(ws)
+
+    async def _answer(self, ws, request: Dict):
+        self.requests += 1
+        response = {"id": request.get('id')}
+        try:
+            response.update(status=200, result=await self._dispatch(request))
+        except BinanceAPIException as e:
+            response.update(status=e.status_code, error={"code": e.code, "msg": e.message})
+        try:
+            await ws.send(json.dumps(response))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _dispatch(self, request: Dict) -> Dict:
+        params = dict(request.get('params', {}))
+        account = self.credentials.get(params.get('apiKey'))
+        if account is None:
+            raise self.exchange.api_error(-2015, "Invalid API-key, IP, or permissions for action.", 401)
+        account_id, api_secret = account
+        signature = params.pop('signature', '')
+        if sign_params(params, api_secret) != signature:
+            raise self.exchange.api_error(-1022, "Signature for this request is not valid.")
+        if request.get('method') != 'order.place':
+            raise self.exchange.api_error(-1000, f"Unsupported method {request.get('method')}")
+        for key in ('apiKey', 'timestamp', 'recvWindow'):
+            params.pop(key, None)
+        return await self.exchange.client(account_id).futures_create_order(**params)
+
+
+def price_from_message(msg: Dict) -> Optional[float]:
+    """Extract the fill price from an ORDER_TRADE_UPDATE message, if any"""
+    if msg.get('e') != 'ORDER_TRADE_UPDATE':
+        return None
+    order = msg.get('o', {})
+    for key in ('ap', 'L', 'p'):
+        try:
+            price = float(order.get(key, 0))
+        except (TypeError, ValueError):
+            continue
+        if price > 0:
+            return price
+    return None
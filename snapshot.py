@@ -0,0 +1,36 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict
+
+from config import STATE_FILE
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(state: Dict):
+    """Atomically write the runtime state snapshot"""
+    payload = {"version": SNAPSHOT_VERSION, "saved_at": datetime.now().isoformat(), **state}
+    tmp_path = STATE_FILE.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, separators=(',', ':'))
+    os.replace(tmp_path, STATE_FILE)
+
+
+def load_snapshot() -> Dict:
+    """Load the runtime state snapshot; empty if missing, unreadable or from another version"""
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        with open(STATE_FILE, 'r') as f:
+            payload = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable state snapshot: %s", e)
+        return {}
+    if payload.get("version") != SNAPSHOT_VERSION:
+        logger.warning("Ignoring state snapshot from a different version")
+        return {}
+    return payload
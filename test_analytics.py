@@ -0,0 +1,78 @@
+import logging
+
+from analytics import copy_quality
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def trade(side: str, price: float, master_price: float = 100.0, slave_id: str = "s1", symbol: str = "BTCUSDT",
+          master_id: str = "m", status: str = "success", seq: int = 0) -> dict:
+    return {"timestamp": str(seq), "master_id": master_id, "slave_id": slave_id, "symbol": symbol, "side": side,
+            "quantity": 1.0, "price": price, "status": status, "master_price": master_price,
+            "master_trade_time": 1000, "dispatched_at": 1010, "acked_at": 1030, "filled_at": 1040}
+
+
+def check_slippage_sign():
+    """Slippage is positive when the slave got the worse price, whichever the side"""
+    report = copy_quality([trade("BUY", 101.0, slave_id="buyer"), trade("SELL", 101.0, slave_id="seller")])
+    assert report["slaves"]["buyer"]["slippage_bps"]["mean"] == 100.0
+    assert report["slaves"]["seller"]["slippage_bps"]["mean"] == -100.0
+    assert report["worst_slippage"][0]["slave_id"] == "buyer"
+    assert report["overall"]["copy_latency_ms"]["p50"] == 10.0
+    assert report["overall"]["ack_latency_ms"]["p50"] == 20.0
+    assert report["overall"]["fill_latency_ms"]["p50"] == 40.0
+    logger.info("Slippage sign follows the side")
+
+
+def check_skipped_records():
+    """Records without a master price and drift corrections are left out; failed ones have no slippage"""
+    trades = [
+        trade("BUY", 101.0, master_price=None),
+        trade("BUY", 120.0, master_id="reconciler"),
+        trade("BUY", 0.0, status="failed"),
+        trade("BUY", 100.5),
+    ]
+    report = copy_quality(trades)
+    assert report["trades"] == 2
+    assert report["overall"]["slippage_bps"]["mean"] == 50.0
+    assert report["overall"]["slippage_bps"]["max"] == 50.0
+    logger.info("Records without a master price and reconciler records skipped")
+
+
+def check_windows():
+    """Recent trades and consecutive windows cover the history in order"""
+    trades = [trade("BUY", 100.0 + seq, seq=seq) for seq in range(5)]
+    report = copy_quality(trades, window=2)
+    slave = report["slaves"]["s1"]
+    assert slave["recent"]["count"] == 2 and slave["recent"]["slippage_bps"]["mean"] == 350.0
+    assert [w["count"] for w in slave["windows"]] == [2, 2, 1]
+    assert [w["until"] for w in slave["windows"]] == ["1", "3", "4"]
+    logger.info("Windows cover the history")
+
+
+def test_slippage_sign():
+    check_slippage_sign()
+
+
+def test_skipped_records():
+    check_skipped_records()
+
+
+def test_windows():
+    check_windows()
+
+
+def main():
+    """Main function"""
+    check_slippage_sign()
+    check_skipped_records()
+    check_windows()
+    logger.info("\nTest completed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import asyncio
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+import copier
+import replay
+from lanes import DispatchLanes
+from position_book import PositionBook
+from reconciler import DriftReconciler
+from scheduler import DispatchScheduler
+from sim_exchange import SimulatedClient, SimulatedExchange
+
+logger = logging.getLogger(__name__)
+
+PRICES = {"BTCUSDT": 60000.0, "ETHUSDT": 3000.0}
+
+
+class RejectingClient(SimulatedClient):
+    """Client of a slave whose API key was revoked: every order is rejected"""
+
+    attempts = 0
+
+    async def futures_create_order(self, **params):
+        RejectingClient.attempts += 1
+        await self.exchange._round_trip()
+        raise self.exchange.api_error(-2015, "Invalid API-key, IP, or permissions for action.", 401)
+
+
+class SkewedClient(SimulatedClient):
+    """Client whose first order arrives outside its recvWindow"""
+
+    rejections = 0
+
+    async def futures_create_order(self, **params):
+        if SkewedClient.rejections == 0:
+            SkewedClient.rejections += 1
+            await self.exchange._round_trip()
+            raise self.exchange.api_error(-1021, "Timestamp for this request is outside of the recvWindow.")
+        return await super().futures_create_order(**params)
+
+
+class SlowClosingSocketManager:
+    """Stands in for BinanceSocketManager: an idle user-data stream that takes a while to close"""
+
+    def __init__(self, client):
+        pass
+
+    def futures_user_socket(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.sleep(0.2)
+
+    async def recv(self):
+        await asyncio.Event().wait()
+
+
+def reset_copier():
+    """Forget the state a previous check left in the copier"""
+    for state in (copier.active_connections, copier.hedge_connections, copier.order_clients,
+                  copier.circuit_breakers, copier.seen_fills, copier.streaming_slaves, copier.pending_fills,
+                  copier.early_fills, copier.ack_latency, copier.inflight_orders, copier.dispatching_masters,
+                  copier.copier_tasks, copier.master_stop_events, copier.position_modes, copier.account_balances):
+        state.clear()
+    copier.trade_log_updates.clear()
+    copier.trade_log_flush = None
+    copier.position_book = PositionBook()
+    copier.reconciler = DriftReconciler()
+    copier.dispatch_lanes = DispatchLanes()
+    copier.dispatch_scheduler = DispatchScheduler()
+    for budget in copier.dispatch_scheduler.budgets.values():
+        budget.interval = 0
+
+
+def start_simulation(data_dir: Path, slaves: int = 1, **exchange_args) -> SimulatedExchange:
+    """Copier on a simulated exchange with master_1 and sim_slave_1..N, all flat"""
+    reset_copier()
+    exchange = SimulatedExchange(latency=0.005, jitter=0, **exchange_args)
+    for symbol, price in PRICES.items():
+        exchange.set_price(symbol, price)
+    replay.setup_simulation(["master_1"], slaves, exchange, data_dir)
+    return exchange
+
+
+def master_fill(seq: int, symbol: str, side: str, quantity: float) -> dict:
+    """ORDER_TRADE_UPDATE of a master MARKET order filled at once"""
+    return {"e": "ORDER_TRADE_UPDATE", "E": seq, "T": seq, "o": {
+        "s": symbol, "c": f"master-{seq}", "S": side, "o": "MARKET", "q": str(quantity),
+        "ap": str(PRICES[symbol]), "L": str(PRICES[symbol]), "l": str(quantity), "z": str(quantity),
+        "X": "FILLED", "x": "TRADE", "i": seq, "t": seq, "T": seq, "ps": "BOTH"}}
+
+
+def slave_orders(exchange: SimulatedExchange, slave_id: str = "sim_slave_1") -> list:
+    return [(o["symbol"], o["side"], float(o["executedQty"])) for o in exchange.orders if o["account_id"] == slave_id]
+
+
+async def check_single_probe():
+    """A slave whose quarantine expired gets one probe, not one per dispatch lane"""
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = start_simulation(Path(tmp))
+        copier.active_connections["sim_slave_1"] = RejectingClient(exchange, "sim_slave_1")
+        RejectingClient.attempts = 0
+        breaker = copier.get_circuit_breaker("sim_slave_1")
+        breaker._quarantine()
+        breaker.next_probe_at = 0
+
+        # Two symbols, so the copies run on two lanes at once
+        await asyncio.gather(
+            copier.handle_master_message(master_fill(1, "BTCUSDT", "BUY", 0.01), "master_1"),
+            copier.handle_master_message(master_fill(2, "ETHUSDT", "BUY", 0.1), "master_1"),
+        )
+        assert RejectingClient.attempts == 1, RejectingClient.attempts
+        assert breaker.quarantine_count == 2, breaker.quarantine_count
+        assert breaker.skipped == 1
+        logger.info("Quarantined slave was probed once")
+
+
+async def check_open_then_close(stream_delay: float):
+    """A master that opens and closes quickly is followed by the slave, however late its own fills stream"""
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = start_simulation(Path(tmp), stream_delay=stream_delay)
+        await asyncio.gather(
+            copier.handle_master_message(master_fill(1, "BTCUSDT", "BUY", 1), "master_1"),
+            copier.handle_master_message(master_fill(2, "BTCUSDT", "BUY", 1), "master_1"),
+            copier.handle_master_message(master_fill(3, "BTCUSDT", "SELL", 1), "master_1"),
+            copier.handle_master_message(master_fill(4, "BTCUSDT", "SELL", 1), "master_1"),
+        )
+        assert slave_orders(exchange) == [
+            ("BTCUSDT", "BUY", 0.001), ("BTCUSDT", "BUY", 0.001),
+            ("BTCUSDT", "SELL", 0.001), ("BTCUSDT", "SELL", 0.001),
+        ], slave_orders(exchange)
+        assert round(exchange.positions["sim_slave_1"]["BTCUSDT"], 10) == 0
+
+        # The slave's fills arriving later must not be counted again
+        await asyncio.sleep(stream_delay + 0.05)
+        assert copier.position_book.get("sim_slave_1", "BTCUSDT") == 0
+        assert not copier.position_book._own_orders.get("sim_slave_1")
+        logger.info("Quick open and close copied with slave fills streamed after %ss", stream_delay)
+
+
+async def check_timestamp_rejection_resent():
+    """An order rejected for its timestamp is sent again after a clock sync, and not counted as a failure"""
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = start_simulation(Path(tmp))
+        copier.clock_client = exchange.client("clock")
+        copier.active_connections["sim_slave_1"] = SkewedClient(exchange, "sim_slave_1")
+        SkewedClient.rejections = 0
+        try:
+            await copier.handle_master_message(master_fill(1, "BTCUSDT", "BUY", 1), "master_1")
+        finally:
+            copier.clock_client = None
+        assert SkewedClient.rejections == 1
+        assert slave_orders(exchange) == [("BTCUSDT", "BUY", 0.001)], slave_orders(exchange)
+        assert copier.get_circuit_breaker("sim_slave_1").consecutive_failures == 0
+        assert copier.position_book.get("sim_slave_1", "BTCUSDT") == 0.001
+        logger.info("Order rejected for its timestamp was resent once")
+
+
+async def check_detach_drains_master():
+    """Fills a detached master left queued on the lanes are still copied"""
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = start_simulation(Path(tmp), slaves=2)
+        copier.active_connections["master_1"] = exchange.client("master_1")
+
+        async def master_stream():
+            # Like monitor_master, the stream task drops the master client when it ends
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await copier.active_connections.pop("master_1").close_connection()
+
+        copier.master_stop_events["master_1"] = asyncio.Event()
+        copier.copier_tasks["master_1"] = asyncio.create_task(master_stream())
+        await asyncio.sleep(0)
+
+        for seq in range(1, 4):
+            copier.handle_master_message(master_fill(seq, "BTCUSDT", "BUY", 1), "master_1")
+        await copier.detach_account("master_1")
+        orders = slave_orders(exchange, "sim_slave_1") + slave_orders(exchange, "sim_slave_2")
+        assert len(orders) == 6, orders
+        logger.info("Detached master's queued fills were copied")
+
+
+async def check_slave_reattached():
+    """A slave detached and attached again keeps the state of its new stream"""
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = start_simulation(Path(tmp))
+        socket_manager = copier.BinanceSocketManager
+        copier.BinanceSocketManager = SlowClosingSocketManager
+        copier.copying_active = True
+        try:
+            assert await copier.open_slave_stream("sim_slave_1")
+            await copier.detach_account("sim_slave_1")
+            # Attached again, as PUT /api/accounts/{id} does
+            copier.active_connections["sim_slave_1"] = exchange.client("sim_slave_1")
+            copier.position_book.load_positions("sim_slave_1", [])
+            assert await copier.open_slave_stream("sim_slave_1")
+            task = copier.slave_stream_tasks["sim_slave_1"]
+            await asyncio.sleep(0.3)
+            assert "sim_slave_1" in copier.streaming_slaves
+            assert copier.position_book.is_known("sim_slave_1")
+            assert copier.slave_stream_tasks.get("sim_slave_1") is task
+            await copier.cancel_tasks([task])
+        finally:
+            copier.copying_active = False
+            copier.BinanceSocketManager = socket_manager
+        logger.info("Re-attached slave kept its new stream")
+
+
+def logged_trades() -> list:
+    with open(copier.TRADES_FILE) as f:
+        return json.load(f)["trades"]
+
+
+async def check_fills_logged_in_batches():
+    """Confirmed fills reach the trade log with the next write instead of one rewrite each"""
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = start_simulation(Path(tmp), stream_delay=0.1)
+        flush_delay = copier.TRADE_LOG_FLUSH_DELAY
+        copier.TRADE_LOG_FLUSH_DELAY = 0.5
+        try:
+            for seq in range(1, 4):
+                await copier.handle_master_message(master_fill(seq, "BTCUSDT", "BUY", 1), "master_1")
+            await asyncio.sleep(0.25)
+            # Fills confirmed, but the log not rewritten yet
+            assert [t["status"] for t in logged_trades()] == ["pending"] * 3
+            assert len(copier.trade_log_updates) == 3
+            # The next saved trade writes them
+            await copier.handle_master_message(master_fill(4, "BTCUSDT", "BUY", 1), "master_1")
+            assert [t["status"] for t in logged_trades()] == ["success"] * 3 + ["pending"]
+            assert all(t["price"] == PRICES["BTCUSDT"] for t in logged_trades()[:3])
+            # ...and the rest follow within the flush delay
+            await asyncio.sleep(0.6)
+            assert [t["status"] for t in logged_trades()] == ["success"] * 4
+            assert copier.trade_log_flush is None and not copier.trade_log_updates
+        finally:
+            copier.TRADE_LOG_FLUSH_DELAY = flush_delay
+        logger.info("Fill outcomes were written in batches")
+
+
+def recent_statuses() -> list:
+    return [t["status"] for t in copier.recent_trades.latest(10)]
+
+
+async def check_pending_fills_resolved():
+    """Fills the slave's stream never confirmed are looked up once the stream closes or too many wait"""
+    with tempfile.TemporaryDirectory() as tmp:
+        start_simulation(Path(tmp), stream_delay=5)
+        socket_manager = copier.BinanceSocketManager
+        copier.BinanceSocketManager = SlowClosingSocketManager
+        pending_limit = copier.PENDING_FILLS_MAX
+        copier.PENDING_FILLS_MAX = 2
+        copier.copying_active = True
+        try:
+            assert await copier.open_slave_stream("sim_slave_1")
+            for seq in range(1, 4):
+                await copier.handle_master_message(master_fill(seq, "BTCUSDT", "BUY", 1), "master_1")
+            await asyncio.sleep(0.05)
+            # The oldest was looked up to keep at most two waiting
+            assert recent_statuses() == ["success", "pending", "pending"], recent_statuses()
+            await copier.cancel_tasks([copier.slave_stream_tasks["sim_slave_1"]])
+            assert recent_statuses() == ["success"] * 3, recent_statuses()
+            assert not copier.pending_fills
+        finally:
+            copier.copying_active = False
+            copier.PENDING_FILLS_MAX = pending_limit
+            copier.BinanceSocketManager = socket_manager
+        logger.info("Unconfirmed fills were looked up")
+
+
+async def check_ack_after_stream_closed():
+    """An ACK response saved after the slave's stream closed is completed from a lookup"""
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange = start_simulation(Path(tmp))
+        exchange.listeners.pop("sim_slave_1")
+        ack = await exchange.client("sim_slave_1").futures_create_order(
+            symbol="BTCUSDT", side="BUY", type="MARKET", quantity=0.001, newClientOrderId="tc-ack",
+            newOrderRespType="ACK")
+        copier.streaming_slaves.discard("sim_slave_1")
+        copier.save_slave_trade({"slave_id": "sim_slave_1", "symbol": "BTCUSDT", "side": "BUY", "quantity": 0.001,
+                                 "price": float(ack["avgPrice"]), "status": "success", "client_order_id": "tc-ack"},
+                                ack)
+        assert recent_statuses() == ["pending"]
+        await asyncio.sleep(0.05)
+        assert copier.recent_trades.latest(1)[0]["status"] == "success"
+        assert copier.recent_trades.latest(1)[0]["price"] == PRICES["BTCUSDT"]
+        logger.info("ACK without a stream was completed from a lookup")
+
+
+def test_single_probe():
+    asyncio.run(check_single_probe())
+
+
+def test_open_then_close():
+    asyncio.run(check_open_then_close(0))
+
+
+def test_open_then_close_late_slave_stream():
+    asyncio.run(check_open_then_close(0.05))
+
+
+def test_timestamp_rejection_resent():
+    asyncio.run(check_timestamp_rejection_resent())
+
+
+def test_detach_drains_master():
+    asyncio.run(check_detach_drains_master())
+
+
+def test_slave_reattached():
+    asyncio.run(check_slave_reattached())
+
+
+def test_fills_logged_in_batches():
+    asyncio.run(check_fills_logged_in_batches())
+
+
+def test_pending_fills_resolved():
+    asyncio.run(check_pending_fills_resolved())
+
+
+def test_ack_after_stream_closed():
+    asyncio.run(check_ack_after_stream_closed())
+
+
+async def main():
+    """Main function"""
+    await check_single_probe()
+    await check_open_then_close(0)
+    await check_open_then_close(0.05)
+    await check_timestamp_rejection_resent()
+    await check_detach_drains_master()
+    await check_slave_reattached()
+    await check_fills_logged_in_batches()
+    await check_pending_fills_resolved()
+    await check_ack_after_stream_closed()
+    logger.info("\nTest completed!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+
+from clock import ServerClock
+from orders import AckLatencyTracker, submit_order
+from sim_exchange import SimulatedClient, SimulatedExchange
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class StalledClient(SimulatedClient):
+    """Client whose order requests never reach the exchange"""
+
+    async def futures_create_order(self, **params):
+        await asyncio.sleep(3600)
+
+
+class SlowAckClient(SimulatedClient):
+    """Client whose orders fill at once but are acked late"""
+
+    async def futures_create_order(self, **params):
+        order = await super().futures_create_order(**params)
+        await asyncio.sleep(0.3)
+        return order
+
+
+class LateClient(SimulatedClient):
+    """Client whose order requests are signed and sent, but reach the exchange late"""
+
+    async def futures_create_order(self, **params):
+        timestamp = int(time.time() * 1000 + self.timestamp_offset)
+        await asyncio.sleep(0.3)
+        return await self._create_order(params, timestamp)
+
+
+def start_exchange() -> SimulatedExchange:
+    exchange = SimulatedExchange(latency=0.01, jitter=0)
+    exchange.set_price("BTCUSDT", 60000)
+    return exchange
+
+
+async def synced_clock(exchange: SimulatedExchange) -> ServerClock:
+    clock = ServerClock()
+    await clock.sync(exchange.client("clock"))
+    return clock
+
+
+def order_params(client_order_id: str) -> dict:
+    return {"symbol": "BTCUSDT", "side": "BUY", "type": "MARKET", "quantity": 0.001,
+            "newClientOrderId": client_order_id}
+
+
+def fast_deadline_tracker() -> AckLatencyTracker:
+    tracker = AckLatencyTracker()
+    tracker.deadline = lambda: 0.05
+    return tracker
+
+
+async def check_slow_ack_not_resent():
+    """An order that filled but acks slowly is found by its id instead of being sent again"""
+    exchange = start_exchange()
+    order = await submit_order(SlowAckClient(exchange, "slave_1"), order_params("tc-slow-ack"),
+                               fast_deadline_tracker(), exchange.client("slave_1"), await synced_clock(exchange))
+    # Let a resend still on its way reach the exchange
+    await asyncio.sleep(0.3)
+    assert order["clientOrderId"] == "tc-slow-ack"
+    assert len(exchange.orders) == 1, exchange.orders
+    assert exchange.positions["slave_1"]["BTCUSDT"] == 0.001
+    logger.info("Slow ack was looked up, not resent")
+
+
+async def check_stalled_order_hedged():
+    """An order that never reached the exchange is resent on the hedge connection"""
+    exchange = start_exchange()
+    order = await submit_order(StalledClient(exchange, "slave_1"), order_params("tc-stalled"),
+                               fast_deadline_tracker(), exchange.client("slave_1"), await synced_clock(exchange))
+    assert order["clientOrderId"] == "tc-stalled"
+    assert len(exchange.orders) == 1, exchange.orders
+    logger.info("Stalled order was hedged")
+
+
+async def check_late_order_not_filled_twice():
+    """A first request that reaches the exchange after the hedge was sent is rejected"""
+    exchange = start_exchange()
+    order = await submit_order(LateClient(exchange, "slave_1"), order_params("tc-late"),
+                               fast_deadline_tracker(), exchange.client("slave_1"), await synced_clock(exchange))
+    assert order["clientOrderId"] == "tc-late"
+    # Let the first request arrive
+    await asyncio.sleep(0.4)
+    assert len(exchange.orders) == 1, exchange.orders
+    assert exchange.positions["slave_1"]["BTCUSDT"] == 0.001
+    logger.info("Late first request was rejected after the hedge filled")
+
+
+async def check_unsynced_clock_not_resent():
+    """Without the exchange clock an order is never resent"""
+    exchange = start_exchange()
+    order = await submit_order(LateClient(exchange, "slave_1"), order_params("tc-unsynced"),
+                               fast_deadline_tracker(), exchange.client("slave_1"), ServerClock())
+    assert order["clientOrderId"] == "tc-unsynced"
+    assert len(exchange.orders) == 1, exchange.orders
+    logger.info("Order was not resent without a synced clock")
+
+
+def test_slow_ack_not_resent():
+    asyncio.run(check_slow_ack_not_resent())
+
+
+def test_stalled_order_hedged():
+    asyncio.run(check_stalled_order_hedged())
+
+
+def test_late_order_not_filled_twice():
+    asyncio.run(check_late_order_not_filled_twice())
+
+
+def test_unsynced_clock_not_resent():
+    asyncio.run(check_unsynced_clock_not_resent())
+
+
+async def main():
+    """Main function"""
+    await check_slow_ack_not_resent()
+    await check_stalled_order_hedged()
+    await check_late_order_not_filled_twice()
+    await check_unsynced_clock_not_resent()
+    logger.info("\nTest completed!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import logging
+
+from position_book import PositionBook, plan_copy
+from reconciler import DriftReconciler
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def order_update(symbol: str, side: str, quantity: float, trade_time: int, client_order_id: str = "",
+                 status: str = "FILLED", execution: str = "TRADE", position_side: str = "BOTH") -> dict:
+    return {"e": "ORDER_TRADE_UPDATE", "T": trade_time, "o": {
+        "s": symbol, "c": client_order_id, "S": side, "l": str(quantity), "z": str(quantity),
+        "X": status, "x": execution, "T": trade_time, "ps": position_side}}
+
+
+def account_update(symbol: str, amount: float, update_time: int) -> dict:
+    return {"e": "ACCOUNT_UPDATE", "T": update_time, "a": {"B": [], "P": [{"s": symbol, "pa": str(amount), "ps": "BOTH"}]}}
+
+
+def test_plan_copy():
+    # Open, add, partial close, full close, reversal
+    assert plan_copy(0, 2) == (0.0, None, 2, 'LONG')
+    assert plan_copy(2, 3) == (0.0, None, 1, 'LONG')
+    assert plan_copy(4, 1) == (0.75, 'LONG', 0.0, None)
+    assert plan_copy(-2, 0) == (1.0, 'SHORT', 0.0, None)
+    assert plan_copy(2, -1) == (1.0, 'LONG', 1, 'SHORT')
+
+
+def test_trades_and_absolute_updates():
+    book = PositionBook()
+    assert book.apply_message("a", order_update("BTCUSDT", "BUY", 1, 10)) is None  # Not seeded yet
+    book.load_positions("a", [{"symbol": "BTCUSDT", "positionAmt": "1"}], as_of=10)
+    assert book.apply_message("a", order_update("BTCUSDT", "BUY", 1, 10)) == 1  # Part of the snapshot
+    assert book.apply_message("a", order_update("BTCUSDT", "BUY", 1, 11)) == 2
+    book.apply_message("a", account_update("BTCUSDT", 5, 20))
+    # A trade the absolute update already includes, arriving after it
+    assert book.apply_message("a", order_update("BTCUSDT", "SELL", 3, 20)) == 5
+    assert book.apply_message("a", order_update("BTCUSDT", "SELL", 3, 21)) == 2
+    assert book.net("a", "BTCUSDT") == 2 and book.symbols("a") == ["BTCUSDT"]
+
+
+def test_own_order_applied_at_ack():
+    book = PositionBook()
+    book.load_positions("s", [])
+    book.expect_order("s", "tc-1", "BTCUSDT", "BOTH", "BUY")
+    book.apply_order_ack("s", "tc-1", 2)
+    assert book.get("s", "BTCUSDT") == 2
+    # The streamed fills are already counted
+    book.apply_message("s", order_update("BTCUSDT", "BUY", 1.5, 5, "tc-1", status="PARTIALLY_FILLED"))
+    book.apply_message("s", order_update("BTCUSDT", "BUY", 0.5, 6, "tc-1"))
+    assert book.get("s", "BTCUSDT") == 2 and not book._own_orders["s"]
+
+
+def test_own_order_streamed_before_ack():
+    book = PositionBook()
+    book.load_positions("s", [])
+    book.expect_order("s", "tc-1", "BTCUSDT", "BOTH", "BUY")
+    book.apply_message("s", order_update("BTCUSDT", "BUY", 1, 5, "tc-1", status="PARTIALLY_FILLED"))
+    book.apply_order_ack("s", "tc-1", 2)
+    assert book.get("s", "BTCUSDT") == 2
+    book.apply_message("s", order_update("BTCUSDT", "BUY", 1, 6, "tc-1"))
+    assert book.get("s", "BTCUSDT") == 2
+
+    # Filled completely before the ack: nothing left to apply
+    book.expect_order("s", "tc-2", "BTCUSDT", "BOTH", "SELL")
+    book.apply_message("s", order_update("BTCUSDT", "SELL", 2, 7, "tc-2"))
+    book.apply_order_ack("s", "tc-2", 2)
+    assert book.get("s", "BTCUSDT") == 0 and not book._own_orders["s"]
+
+
+def test_own_order_partly_expired():
+    book = PositionBook()
+    book.load_positions("s", [])
+    book.expect_order("s", "tc-1", "BTCUSDT", "BOTH", "BUY")
+    book.apply_order_ack("s", "tc-1", 2)
+    book.apply_message("s", order_update("BTCUSDT", "BUY", 0.5, 5, "tc-1", status="PARTIALLY_FILLED"))
+    book.apply_message("s", order_update("BTCUSDT", "BUY", 0, 6, "tc-1", status="EXPIRED", execution="EXPIRED"))
+    assert book.get("s", "BTCUSDT") == 0.5
+
+
+def test_own_order_replaced_by_absolute_update():
+    book = PositionBook()
+    book.load_positions("s", [])
+    book.expect_order("s", "tc-1", "BTCUSDT", "BOTH", "BUY")
+    book.apply_order_ack("s", "tc-1", 1)
+    # A late absolute update from before the order wipes the early change...
+    book.apply_message("s", account_update("BTCUSDT", 0, 4))
+    assert book.get("s", "BTCUSDT") == 0
+    # ...so the order's trade is applied when it arrives
+    book.apply_message("s", order_update("BTCUSDT", "BUY", 1, 5, "tc-1"))
+    assert book.get("s", "BTCUSDT") == 1
+
+
+def test_reconciler_ratios():
+    book = PositionBook()
+    reconciler = DriftReconciler()
+    book.load_positions("m", [{"symbol": "BTCUSDT", "positionAmt": "2"}])
+    book.load_positions("s", [{"symbol": "BTCUSDT", "positionAmt": "0.02"}])
+    # Master opened 2, slave was sized at 0.02: ratio 0.01
+    reconciler.record_copy("m", "s", "BTCUSDT", (0, 2), 0.02)
+    assert reconciler.expected_position(book, "s", "BTCUSDT") == 0.02
+    # Master adds 2, slave only 0.01 of it: ratio of the whole position is (0.02 + 0.01) / 4
+    reconciler.record_copy("m", "s", "BTCUSDT", (2, 4), 0.01)
+    assert abs(reconciler.ratios["s"]["m"]["BTCUSDT"] - 0.0075) < 1e-12
+    # A partial close keeps the ratio
+    reconciler.record_copy("m", "s", "BTCUSDT", (4, 2), 0)
+    assert abs(reconciler.ratios["s"]["m"]["BTCUSDT"] - 0.0075) < 1e-12
+
+    # Drift is only reported once it was seen on two checks in a row
+    book.load_positions("m", [{"symbol": "BTCUSDT", "positionAmt": "2"}])
+    book.load_positions("s", [{"symbol": "BTCUSDT", "positionAmt": "0.03"}])
+    assert reconciler.find_drift(book, "s") == []
+    drift = reconciler.find_drift(book, "s")
+    assert len(drift) == 1 and drift[0]["expected"] == 0.015 and drift[0]["actual"] == 0.03
+
+
+def main():
+    """Main function"""
+    test_plan_copy()
+    test_trades_and_absolute_updates()
+    test_own_order_applied_at_ack()
+    test_own_order_streamed_before_ack()
+    test_own_order_partly_expired()
+    test_own_order_replaced_by_absolute_update()
+    test_reconciler_ratios()
+    logger.info("\nTest completed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import logging
+
+from recent_trades import RecentTrades
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def trade(seq: int, slave_id: str = "s1", symbol: str = "BTCUSDT", status: str = "success",
+          quantity: float = 1.0, price: float = 100.0) -> dict:
+    return {"timestamp": str(seq), "master_id": "m", "slave_id": slave_id, "symbol": symbol, "side": "BUY",
+            "quantity": quantity, "price": price, "status": status, "client_order_id": f"tc-{seq}"}
+
+
+def check_ring_wraps():
+    """The ring keeps the newest `capacity` records, oldest first"""
+    ring = RecentTrades(capacity=3)
+    for seq in range(1, 6):
+        ring.append(trade(seq))
+    assert [t["timestamp"] for t in ring.latest(10)] == ["3", "4", "5"]
+    assert [t["timestamp"] for t in ring.latest(2)] == ["4", "5"]
+    assert ring.latest(0) == []
+    # Totals still count the evicted records
+    assert ring.summary()["overall"]["trades"] == 5
+    assert ring.summary()["recent"] == 3
+    logger.info("Ring wraps at capacity")
+
+
+def check_update_after_eviction():
+    """An evicted record can no longer be updated and leaves the id index"""
+    ring = RecentTrades(capacity=2)
+    ring.append(trade(1, status="pending"))
+    ring.append(trade(2, status="pending"))
+    ring.append(trade(3, status="pending"))
+    assert "tc-1" not in ring.by_order_id
+    assert not ring.update("tc-1", {"status": "success"})
+    assert ring.update("tc-2", {"status": "success"})
+    assert ring.totals.pending == 2 and ring.totals.success == 1
+    logger.info("Evicted records leave the index")
+
+
+def check_totals_follow_updates():
+    """Completing a pending record moves it from pending to success or failed"""
+    ring = RecentTrades()
+    ring.append(trade(1, status="pending", price=None))
+    ring.append(trade(2, status="pending", price=None))
+    ring.update("tc-1", {"status": "success", "price": 200.0})
+    ring.update("tc-2", {"status": "failed", "error": "Order expired"})
+    totals = ring.summary()["overall"]
+    assert (totals["success"], totals["failed"], totals["pending"]) == (1, 1, 0)
+    assert totals["notional"] == 200.0 and totals["success_rate"] == 0.5
+    assert ring.latest(2)[1]["error"] == "Order expired"
+    logger.info("Totals follow record updates")
+
+
+def check_summary_per_slave_and_symbol():
+    """The summary breaks totals down per slave and per slave and symbol"""
+    ring = RecentTrades()
+    ring.append(trade(1, "s1", "BTCUSDT", quantity=0.5, price=100.0))
+    ring.append(trade(2, "s1", "ETHUSDT", quantity=2.0, price=10.0))
+    ring.append(trade(3, "s2", "BTCUSDT", status="failed"))
+    summary = ring.summary()
+    assert list(summary["slaves"]) == ["s1", "s2"]
+    s1 = summary["slaves"]["s1"]
+    assert s1["trades"] == 2 and s1["notional"] == 70.0
+    assert s1["symbols"]["ETHUSDT"]["quantity"] == 2.0
+    assert summary["slaves"]["s2"]["symbols"]["BTCUSDT"]["success_rate"] == 0.0
+    assert summary["capacity"] == ring.capacity
+    logger.info("Summary per slave and symbol")
+
+
+def test_ring_wraps():
+    check_ring_wraps()
+
+
+def test_update_after_eviction():
+    check_update_after_eviction()
+
+
+def test_totals_follow_updates():
+    check_totals_follow_updates()
+
+
+def test_summary_per_slave_and_symbol():
+    check_summary_per_slave_and_symbol()
+
+
+def main():
+    """Main function"""
+    check_ring_wraps()
+    check_update_after_eviction()
+    check_totals_follow_updates()
+    check_summary_per_slave_and_symbol()
+    logger.info("\nTest completed!")
+
+if __name__ == "__main__":
+    main()
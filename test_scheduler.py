@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+
+from scheduler import DispatchScheduler, TokenBucket
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TIERS = {
+    "premium": {"interval": 0, "burst": 1},
+    "standard": {"interval": 0.05, "burst": 1},
+    "economy": {"interval": 0.2, "burst": 2},
+}
+
+
+def check_dispatch_order():
+    """Slaves go out by tier, then fastest p50 ack first; unmeasured ones last in their tier"""
+    scheduler = DispatchScheduler(TIERS)
+    latency = {"fast": 0.01, "slow": 0.5, "vip": 0.9, "cheap": 0.001}
+    slaves = [
+        {"id": "cheap", "tier": "economy"},
+        {"id": "new", "tier": "standard"},
+        {"id": "slow"},
+        {"id": "fast", "tier": "unknown-tier"},
+        {"id": "vip", "tier": "premium"},
+    ]
+    ordered = [slave["id"] for slave in scheduler.order(slaves, latency.get)]
+    assert ordered == ["vip", "fast", "slow", "new", "cheap"], ordered
+    logger.info("Dispatch order by tier and latency")
+
+
+async def check_token_bucket():
+    """A bucket lets its burst through at once, then one order per interval"""
+    bucket = TokenBucket(interval=0.05, burst=2)
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+    assert 0.09 <= elapsed < 0.2, elapsed
+    assert bucket.waited > 0
+    logger.info("Token bucket paces after its burst")
+
+
+async def check_tier_budgets_separate():
+    """A throttled tier does not slow down the others"""
+    scheduler = DispatchScheduler(TIERS)
+    # Use up the economy budget
+    await scheduler.acquire("economy")
+    await scheduler.acquire("economy")
+    start = time.monotonic()
+    for _ in range(5):
+        await scheduler.acquire("premium")
+    await scheduler.acquire("standard")
+    assert time.monotonic() - start < 0.02
+    await scheduler.acquire("economy")
+    assert time.monotonic() - start >= 0.15
+    snapshot = scheduler.snapshot()
+    assert (snapshot["premium"]["orders"], snapshot["standard"]["orders"], snapshot["economy"]["orders"]) == (5, 1, 3)
+    assert snapshot["premium"]["throttled_s"] == 0 and snapshot["economy"]["throttled_s"] > 0
+    logger.info("Tier budgets pace their own orders only")
+
+
+def test_dispatch_order():
+    check_dispatch_order()
+
+
+def test_token_bucket():
+    asyncio.run(check_token_bucket())
+
+
+def test_tier_budgets_separate():
+    asyncio.run(check_tier_budgets_separate())
+
+
+async def main():
+    """Main function"""
+    check_dispatch_order()
+    await check_token_bucket()
+    await check_tier_budgets_separate()
+    logger.info("\nTest completed!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
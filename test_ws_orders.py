@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+
+from binance.exceptions import BinanceAPIException
+
+from sim_exchange import SimulatedExchange, SimulatedWsApi
+from ws_orders import WsOrderClient
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+logging.getLogger("websockets").setLevel(logging.WARNING)
+
+API_KEY = "sim-key"
+API_SECRET = "sim-secret"
+
+
+async def start_stand_in(latency: float = 0.0):
+    """Simulated exchange with a local WebSocket API server and a WS order client for one slave"""
+    exchange = SimulatedExchange(latency=latency, jitter=0)
+    exchange.set_price("BTCUSDT", 60000)
+    server = SimulatedWsApi(exchange, {API_KEY: ("slave_1", API_SECRET)})
+    url = await server.start()
+    client = WsOrderClient(exchange.client("slave_1"), API_KEY, API_SECRET, url=url)
+    await client.connect()
+    return exchange, server, client
+
+
+def order_params(client_order_id: str, side: str = "BUY") -> dict:
+    return {"symbol": "BTCUSDT", "side": side, "type": "MARKET", "quantity": 0.01,
+            "newClientOrderId": client_order_id}
+
+
+async def check_order_over_websocket():
+    exchange, server, client = await start_stand_in()
+    try:
+        order = await client.futures_create_order(**order_params("tc-ws-1"))
+        assert order["clientOrderId"] == "tc-ws-1" and order["status"] == "FILLED"
+        assert client.ws_orders == 1 and client.rest_fallbacks == 0
+        assert server.requests == 1
+        assert exchange.positions["slave_1"]["BTCUSDT"] == 0.01
+        logger.info("Order placed over the WebSocket API")
+    finally:
+        await client.close_connection()
+        await server.stop()
+
+
+async def check_api_errors():
+    exchange, server, client = await start_stand_in()
+    try:
+        try:
+            await client.futures_create_order(**{**order_params("tc-ws-zero"), "quantity": 0})
+            raise AssertionError("zero quantity was accepted")
+        except BinanceAPIException as e:
+            assert e.code == -4003, e
+
+        bad_client = WsOrderClient(exchange.client("slave_1"), API_KEY, "wrong-secret", url=client.url)
+        await bad_client.connect()
+        try:
+            await bad_client.futures_create_order(**order_params("tc-ws-bad"))
+            raise AssertionError("bad signature was accepted")
+        except BinanceAPIException as e:
+            assert e.code == -1022, e
+        finally:
+            await bad_client.close_connection()
+        logger.info("WebSocket API errors raised as BinanceAPIException")
+    finally:
+        await client.close_connection()
+        await server.stop()
+
+
+async def check_rest_fallback():
+    exchange, server, client = await start_stand_in()
+    try:
+        await server.drop_connections()
+        while client.connected:
+            await asyncio.sleep(0.01)
+
+        order = await client.futures_create_order(**order_params("tc-ws-fallback"))
+        assert order["clientOrderId"] == "tc-ws-fallback"
+        assert client.rest_fallbacks == 1 and server.requests == 0
+
+        # The socket is reopened in the background
+        for _ in range(100):
+            if client.connected:
+                break
+            await asyncio.sleep(0.05)
+        assert client.connected
+        await client.futures_create_order(**order_params("tc-ws-after"))
+        assert client.ws_orders == 1 and server.requests == 1
+        logger.info("Orders fell back to REST while the socket was down")
+    finally:
+        await client.close_connection()
+        await server.stop()
+
+
+async def measure_round_trip(orders: int = 200):
+    """Mean order round trip over the local WebSocket API (transport overhead only)"""
+    exchange, server, client = await start_stand_in()
+    try:
+        start = time.perf_counter()
+        for i in range(orders):
+            await client.futures_create_order(**order_params(f"tc-ws-rt-{i}", "BUY" if i % 2 else "SELL"))
+        elapsed = time.perf_counter() - start
+        logger.info(f"{orders} WebSocket API orders, mean round trip {elapsed / orders * 1000:.3f} ms")
+    finally:
+        await client.close_connection()
+        await server.stop()
+
+
+def test_order_over_websocket():
+    asyncio.run(check_order_over_websocket())
+
+
+def test_api_errors():
+    asyncio.run(check_api_errors())
+
+
+def test_rest_fallback():
+    asyncio.run(check_rest_fallback())
+
+
+async def main():
+    """Main function"""
+    await check_order_over_websocket()
+    await check_api_errors()
+    await check_rest_fallback()
+    await measure_round_trip()
+    logger.info("\nTest completed!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import time
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+import websockets
+from binance import AsyncClient
+from binance.exceptions import BinanceAPIException
+
+from config import WS_API_URL, WS_API_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+def sign_params(params: Dict, api_secret: str) -> str:
+    """HMAC-SHA256 signature of WebSocket API request parameters (sorted by name)"""
+    payload = urlencode(sorted(params.items()))
+    return hmac.new(api_secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+class WsOrderClient:
+    """Places orders over the Binance futures WebSocket API (`order.place`)
+
+    One authenticated socket per account replaces an HTTPS request per order.
+    While the socket is down, orders go over the REST client and the socket is
+    reopened in the background. Every other call is passed through to the REST
+    client, so this can be used wherever an AsyncClient places orders.
+    """
+
+    def __init__(self, rest_client: AsyncClient, api_key: str, api_secret: str, url: str = WS_API_URL):
+        self.rest_client = rest_client
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.url = url
+        self.ws_orders = 0
+        self.rest_fallbacks = 0
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._closed = False
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    async def connect(self):
+        """Open the socket; raises if it cannot be opened"""
+        self._ws = await websockets.connect(self.url, ping_interval=20, max_queue=None)
+        self._reader = asyncio.create_task(self._read_responses(self._ws))
+        logger.info("WebSocket API session open (%s)", self.url)
+
+    async def _read_responses(self, ws):
+        try:
+            async for raw in ws:
+                response = json.loads(raw)
+                future = self._pending.pop(str(response.get('id')), None)
+                if future and not future.done():
+                    future.set_result(response)
+        except Exception as e:
+            logger.warning("WebSocket API session closed: %s", e)
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            # Requests still waiting will never be answered on this socket
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("WebSocket API session closed"))
+            self._pending.clear()
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self._closed or (self._reconnect and not self._reconnect.done()):
+            return
+        self._reconnect = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        delay = 1
+        while not self._closed and self._ws is None:
+            try:
+                await self.connect()
+            except Exception as e:
+                logger.warning("WebSocket API reconnect failed: %s", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    async def request(self, method: str, params: Dict) -> Dict:
+        """Send a signed request and return its result; raises BinanceAPIException on errors"""
+        ws = self._ws
+        if ws is None:
+            raise ConnectionError("WebSocket API session not open")
+
+        params = {key: str(value) for key, value in params.items()}
+        params['apiKey'] = self.api_key
+        params['timestamp'] = str(int(time.time() * 1000 + getattr(self.rest_client, 'timestamp_offset', 0)))
+        params['signature'] = sign_params(params, self.api_secret)
+
+        request_id = str(next(self._ids))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await ws.send(json.dumps({"id": request_id, "method": method, "params": params}))
+            response = await asyncio.wait_for(future, WS_API_TIMEOUT)
+        finally:
+            self._pending.pop(request_id, None)
+
+        if response.get('status') != 200:
+            error = response.get('error', {})
+            raise BinanceAPIException(None, response.get('status', 400), json.dumps(error))
+        return response['result']
+
+    async def futures_create_order(self, **params) -> Dict:
+        if self._ws is None:
+            # Socket down: REST keeps orders flowing while it reconnects
+            self._schedule_reconnect()
+            self.rest_fallbacks += 1
+            return await self.rest_client.futures_create_order(**params)
+        order = await self.request('order.place', params)
+        self.ws_orders += 1
+        return order
+
+    def __getattr__(self, name):
+        return getattr(self.rest_client, name)
+
+    async def close_connection(self):
+        """Close the socket; the REST client is closed by its owner"""
+        self._closed = True
+        for task in (self._reconnect, self._reader):
+            if task:
+                task.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+
+    def snapshot(self) -> Dict:
+        """Transport state for the status API"""
+        return {
+            "transport": "ws",
+            "connected": self.connected,
+            "ws_orders": self.ws_orders,
+            "rest_fallbacks": self.rest_fallbacks,
+        }